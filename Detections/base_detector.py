@@ -3,8 +3,50 @@ import mediapipe as mp
 mp_hands = mp.solutions.hands
 
 class BaseDetector:
-    def __init__(self, emoji_spawner):
+    # Registry key, also used to look the detector up at runtime
+    name = None
+    # Preconditions checked by the ReactionManager before detect() is called
+    required_hands = None # Exact number of hands the gesture needs, None for any
+    requires_face = False
+    cooldown = 0 # Frames to wait after this detector's reaction ends before detecting again
+    priority = 0 # Higher priority detectors get the first chance to fire
+    score_threshold = 0.5 # Minimum GestureClassifier score that counts as the gesture
+    # Numeric attributes that may be adjusted at runtime, e.g. through the control API
+    tunables = ("cooldown", "score_threshold")
+
+    def __init__(self, emoji_spawner, reaction_manager):
         self.emoji_spawner = emoji_spawner
+        self.reaction_manager = reaction_manager
+        self.enabled = True
+        # StageTimings names of detect() and apply_effect(), built once instead of every frame
+        self.detect_stage = f"detect:{self.name}"
+        self.effect_stage = f"effect:{self.name}"
+
+    def is_eligible(self, perception):
+        """Checks the declared preconditions against the current frame."""
+        if self.required_hands is not None and perception.num_hands != self.required_hands:
+            return False
+        if self.requires_face and not perception.faces:
+            return False
+        return True
+
+    def matches(self, perception):
+        """Whether the gesture is showing: the GestureClassifier's score when it ran, else the detector's own rules."""
+        scores = perception.gesture_scores
+        if scores is not None and self.name in scores:
+            return scores[self.name] >= self.score_threshold
+        return self.matches_rules(perception)
+
+    def matches_rules(self, perception):
+        """Hand-written checks for the gesture on the current frame."""
+        return False
+
+    def detect(self, perception, frame):
+        pass
+
+    def apply_effect(self, frame, perception):
+        pass
 
-    def detect(self, hands, frame):
-        pass
\ No newline at end of file
+    def preload(self, frame_shape):
+        """Prepares the effect's assets ahead of the first reaction; may run on a background thread."""
+        pass
@@ -1,109 +1,76 @@
-import mediapipe as mp
-import cv2
+import functools
 import math
+import cv2
+import numpy as np
+from compositing import Sprite, blend
 from Detections.base_detector import BaseDetector
-from Detections.face_detector import FaceDetector
+from Detections.hand_features import INDEX, MIDDLE, INDEX_FINGER_TIP
 
-mp_hands = mp.solutions.hands
+REFERENCE_FACE_WIDTH = 160 # px; face width the blush radius and cheek offset were tuned for
 
 class BlushDetector(BaseDetector):
+    name = "blush"
+    required_hands = 2
+    requires_face = True
+    tunables = BaseDetector.tunables + ("blush_duration",)
+
     def __init__(self, emoji_spawner, reaction_manager):
-        super().__init__(emoji_spawner)
-        self.reaction_manager = reaction_manager # Store the ReactionManager instance
+        super().__init__(emoji_spawner, reaction_manager)
         self.blush_active = False
         self.blush_duration = 40  # frames
         self.blush_timer = 0
-        self.face_detector = FaceDetector()
-
-    def detect(self, hands, frame):
-        # If another reaction is active, do not perform detection
-        if self.reaction_manager.is_reaction_active():
-            return
 
-        faces = self.face_detector.detect(frame)
+    def matches_rules(self, perception):
+        features = perception.features
+        left, right = features.order_by_x(INDEX_FINGER_TIP)
+        scale = features.palm_scale
 
-        if not faces or len(hands) != 2:
-            self.blush_active = False
-            return
+        # Index fingertips touching, measured in pixels at the reference palm size
+        dx, dy = features.inter_hand[INDEX_FINGER_TIP]
+        distance = math.hypot(dx * perception.width, dy * perception.height)
+        if distance > 50 * scale.mean():
+            return False
 
-        tip_x_1 = hands[0].landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP].x
-        tip_x_2 = hands[1].landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP].x
+        tip_dx = features.tip_offsets[:, :, 0]
+        pointing_inward = tip_dx[left, INDEX] > 0 and tip_dx[right, INDEX] < 0
 
-        if tip_x_1 < tip_x_2:
-            left_hand = hands[0].landmark
-            right_hand = hands[1].landmark
-        else:
-            left_hand = hands[1].landmark
-            right_hand = hands[0].landmark
+        # Middle, ring and pinky curled back towards the other hand
+        left_curled = (tip_dx[left, MIDDLE:] < -0.01 * scale[left]).all()
+        right_curled = (tip_dx[right, MIDDLE:] > -0.01 * scale[right]).all()
 
-        h, w, _ = frame.shape
-        def px(lm): return int(lm.x * w), int(lm.y * h)
+        return bool(pointing_inward and left_curled and right_curled)
 
-        tip1, mcp1 = left_hand[mp_hands.HandLandmark.INDEX_FINGER_TIP], left_hand[mp_hands.HandLandmark.INDEX_FINGER_MCP]
-        tip2, mcp2 = right_hand[mp_hands.HandLandmark.INDEX_FINGER_TIP], right_hand[mp_hands.HandLandmark.INDEX_FINGER_MCP]
-
-        x1, y1 = px(tip1)
-        x2, y2 = px(tip2)
-        distance = math.hypot(x2 - x1, y2 - y1)
-        if distance > 50:
-            self.blush_active = False
-            return
-
-        dir1_x = tip1.x - mcp1.x
-        dir2_x = tip2.x - mcp2.x
-        pointing_inward = dir1_x > 0 and dir2_x < 0
-
-        def fingers_curled(lm, hand_type):
-            if hand_type == 'left':
-                return all(
-                    lm[tip].x + 0.01 < lm[mcp].x
-                    for tip, mcp in [
-                        (mp_hands.HandLandmark.MIDDLE_FINGER_TIP, mp_hands.HandLandmark.MIDDLE_FINGER_MCP),
-                        (mp_hands.HandLandmark.RING_FINGER_TIP, mp_hands.HandLandmark.RING_FINGER_MCP),
-                        (mp_hands.HandLandmark.PINKY_TIP, mp_hands.HandLandmark.PINKY_MCP)
-                    ]
-                )
-            else:
-                return all(
-                    lm[tip].x > lm[mcp].x - 0.01
-                    for tip, mcp in [
-                        (mp_hands.HandLandmark.MIDDLE_FINGER_TIP, mp_hands.HandLandmark.MIDDLE_FINGER_MCP),
-                        (mp_hands.HandLandmark.RING_FINGER_TIP, mp_hands.HandLandmark.RING_FINGER_MCP),
-                        (mp_hands.HandLandmark.PINKY_TIP, mp_hands.HandLandmark.PINKY_MCP)
-                    ]
-                )
-
-        if pointing_inward and fingers_curled(left_hand, 'left') and fingers_curled(right_hand, 'right'):
+    def detect(self, perception, frame):
+        if self.matches(perception):
             if not self.blush_active:
                 print("BlushDetector: Blush gesture detected!")
                 self.blush_active = True
                 self.blush_timer = self.blush_duration
-                self.reaction_manager.set_reaction_active(True) # Set reaction active
+                self.reaction_manager.start_reaction(self)
         else:
             self.blush_active = False
 
 
-    def apply_effect(self, frame, hands_landmarks):
+    def apply_effect(self, frame, perception):
         if self.blush_active and self.blush_timer > 0:
             # Cancel blush if hands are gone even though face is present
-            if not hands_landmarks or len(hands_landmarks) < 2:
+            if perception.num_hands < 2:
                 self.blush_timer = 0
                 self.blush_active = False
-                self.reaction_manager.set_reaction_active(False) # Set reaction inactive
+                self.reaction_manager.end_reaction(self)
                 return
 
-            faces = self.face_detector.detect(frame)
-            if faces:
-                self.draw_blush(frame, faces)
+            if perception.faces:
+                self.draw_blush(frame, perception.faces)
             self.blush_timer -= 1
             if self.blush_timer <= 0:
                 self.blush_active = False
-                self.reaction_manager.set_reaction_active(False) # Set reaction inactive
+                self.reaction_manager.end_reaction(self)
         elif self.blush_active and self.blush_timer <= 0:
              # This case handles when blush_active is True but timer ran out in a previous frame
              # Ensure reaction is set to inactive
              self.blush_active = False
-             self.reaction_manager.set_reaction_active(False)
+             self.reaction_manager.end_reaction(self)
 
     def draw_blush(self, frame, faces):
         if not faces:
@@ -118,19 +85,32 @@ class BlushDetector(BaseDetector):
         left_eye = keypoints[1]
         mouth_center = keypoints[3]
 
-        right_cheek_x = int((right_eye[0] + mouth_center[0]) / 2 + (right_eye[0] - mouth_center[0]) * 0.5) - 20
+        # Radius and cheek offset follow the face size (25 px and 20 px for a reference-sized face)
+        face_scale = face["bbox"][2] / REFERENCE_FACE_WIDTH
+        radius = max(4, int(round(25 * face_scale)))
+        offset = int(round(20 * face_scale))
+
+        right_cheek_x = int((right_eye[0] + mouth_center[0]) / 2 + (right_eye[0] - mouth_center[0]) * 0.5) - offset
         right_cheek_y = int((right_eye[1] + mouth_center[1]) / 2)
-        left_cheek_x = int((left_eye[0] + mouth_center[0]) / 2 + (left_eye[0] - mouth_center[0]) * 0.5) + 20
+        left_cheek_x = int((left_eye[0] + mouth_center[0]) / 2 + (left_eye[0] - mouth_center[0]) * 0.5) + offset
         left_cheek_y = int((left_eye[1] + mouth_center[1]) / 2)
 
-        overlay = frame.copy()
-        blush_color = (147, 20, 255)
-        radius = 25
-        alpha = 0.5
-        blur = (49, 49)
-
-        cv2.circle(overlay, (right_cheek_x, right_cheek_y), radius, blush_color, -1)
-        cv2.circle(overlay, (left_cheek_x, left_cheek_y), radius, blush_color, -1)
-
-        blurred = cv2.GaussianBlur(overlay, blur, 0)
-        cv2.addWeighted(blurred, alpha, frame, 1 - alpha, 0, frame)
+        sprite = blush_sprite(radius)
+        half = sprite.shape[0] // 2
+        blend(frame, sprite, right_cheek_x - half, right_cheek_y - half)
+        blend(frame, sprite, left_cheek_x - half, left_cheek_y - half)
+
+
+@functools.lru_cache(maxsize=32)
+def blush_sprite(radius, color=(147, 20, 255), alpha=0.5):
+    """Pre-blurred radial blush of the given radius, as a premultiplied sprite centered in its square."""
+    sigma = radius * 0.31 # The 49x49 blur used on a 25 px circle
+    half = radius + int(3 * sigma) + 1
+    mask = np.zeros((2 * half + 1, 2 * half + 1), dtype=np.float32)
+    cv2.circle(mask, (half, half), radius, 1.0, -1)
+    mask = cv2.GaussianBlur(mask, (0, 0), sigma)
+
+    bgra = np.empty(mask.shape + (4,), dtype=np.uint8)
+    bgra[:, :, :3] = color
+    bgra[:, :, 3] = np.round(mask * alpha * 255).astype(np.uint8)
+    return Sprite.from_bgra(bgra)
@@ -1,36 +1,43 @@
 import mediapipe as mp
 import cv2
 
+def faces_from_detections(detections, frame_shape):
+    """Converts MediaPipe face detections to bbox/keypoint dicts in pixel coordinates."""
+    faces = []
+    if detections:
+        ih, iw = frame_shape[:2]
+        for detection in detections:
+            # Extract bounding box information
+            bboxC = detection.location_data.relative_bounding_box
+            bbox = (int(bboxC.xmin * iw), int(bboxC.ymin * ih),
+                    int(bboxC.width * iw), int(bboxC.height * ih))
+
+            # Extract key points (like eyes, nose, mouth, cheeks)
+            keypoints = []
+            for kp in detection.location_data.relative_keypoints:
+                x = int(kp.x * iw)
+                y = int(kp.y * ih)
+                keypoints.append((x, y))
+
+            faces.append({"bbox": bbox, "keypoints": keypoints})
+
+    return faces
+
 class FaceDetector:
     def __init__(self, min_detection_confidence=0.5):
         self.mp_face_detection = mp.solutions.face_detection
         self.face_detection = self.mp_face_detection.FaceDetection(min_detection_confidence=min_detection_confidence)
 
-    def detect(self, frame):
-        # Convert the BGR frame to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def detect(self, frame, rgb_frame=None):
+        # Convert the BGR frame to RGB, unless the caller already has it
+        if rgb_frame is None:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return self.detect_rgb(rgb_frame)
+
+    def detect_rgb(self, rgb_frame):
         # Process the frame and find faces
         results = self.face_detection.process(rgb_frame)
-        
-        faces = []
-        if results.detections:
-            for detection in results.detections:
-                # Extract bounding box information
-                bboxC = detection.location_data.relative_bounding_box
-                ih, iw, _ = frame.shape
-                bbox = (int(bboxC.xmin * iw), int(bboxC.ymin * ih),
-                        int(bboxC.width * iw), int(bboxC.height * ih))
-                
-                # Extract key points (like eyes, nose, mouth, cheeks)
-                keypoints = []
-                for kp in detection.location_data.relative_keypoints:
-                    x = int(kp.x * iw)
-                    y = int(kp.y * ih)
-                    keypoints.append((x, y))
-                    
-                faces.append({"bbox": bbox, "keypoints": keypoints})
-                
-        return faces
+        return faces_from_detections(results.detections, rgb_frame.shape)
 
     def __del__(self):
         self.face_detection.close()
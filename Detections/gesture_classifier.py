@@ -0,0 +1,179 @@
+import itertools
+
+import numpy as np
+
+from .hand_features import (
+    WRIST, THUMB_CMC, THUMB_TIP, INDEX_FINGER_TIP, NUM_LANDMARKS, FINGER_CHAINS, PALM_MCPS,
+    INDEX_FINGER_MCP, MIDDLE_FINGER_MCP, RING_FINGER_MCP, PINKY_MCP,
+)
+
+# Landmarks whose offset from one hand to the other describes a two-hand gesture
+RELATION_LANDMARKS = np.array([WRIST, THUMB_TIP, INDEX_FINGER_TIP])
+RELATION_WEIGHT = 2.0 # Weight of the hand-to-hand offsets against the 80 hand shape coordinates
+
+# Knuckle layouts of a right hand in palm units (wrist at the origin, y down), as seen
+# in the mirrored output: palm-on with the fingers up and the thumb towards -x, or
+# edge-on with the fingers towards -x and the index knuckle on top.
+_PALM_ON = {THUMB_CMC: (-0.3, -0.2), INDEX_FINGER_MCP: (-0.3, -0.95), MIDDLE_FINGER_MCP: (-0.05, -1.0),
+            RING_FINGER_MCP: (0.18, -0.93), PINKY_MCP: (0.38, -0.82)}
+_EDGE_ON = {THUMB_CMC: (-0.25, -0.3), INDEX_FINGER_MCP: (-0.8, -0.55), MIDDLE_FINGER_MCP: (-0.85, -0.3),
+            RING_FINGER_MCP: (-0.82, -0.08), PINKY_MCP: (-0.75, 0.12)}
+
+# Finger segments (MCP to PIP to DIP to tip; CMC to MCP to IP to tip for the thumb) as offsets
+_UP = ((0, -0.45), (0, -0.28), (0, -0.22))
+_CURLED = ((0, -0.15), (0.05, 0.28), (0, 0.22)) # Folded over the palm, tip below the knuckle
+_FIST = ((-0.25, 0.05), (0.15, 0.2), (0.25, 0.1)) # Edge-on, tip tucked back towards the wrist
+_POINTING = ((-0.45, 0), (-0.28, 0), (-0.22, 0)) # Edge-on, straight towards -x
+_THUMB_UP = ((-0.2, -0.4), (0, -0.42), (0, -0.38))
+_THUMB_WRAPPED = ((-0.2, -0.15), (-0.15, 0.1), (-0.05, 0.15))
+_THUMB_ACROSS = ((0.05, -0.3), (0.2, -0.1), (0.15, 0))
+
+
+def _pose(knuckles, thumb, index, middle, ring, pinky, rotate=0.0):
+    """A right hand's (21, 2) landmarks built from a knuckle layout and per-finger segments."""
+    hand = np.zeros((NUM_LANDMARKS, 2))
+    for chain, segments in zip(FINGER_CHAINS, (thumb, index, middle, ring, pinky)):
+        point = np.array(knuckles[chain[1]], dtype=float)
+        hand[chain[1]] = point
+        for landmark, offset in zip(chain[2:], segments):
+            point = point + offset
+            hand[landmark] = point
+    if rotate:
+        c, s = np.cos(np.radians(rotate)), np.sin(np.radians(rotate))
+        hand = hand @ np.array([[c, s], [-s, c]])
+    return hand
+
+
+def _mirror(hand):
+    return hand * (-1, 1)
+
+
+def _pair(right, offset):
+    """Two hands: ``right`` at ``offset`` palm units right of the wrist of its mirror image."""
+    return np.stack([_mirror(right), right + (offset, 0)]), ("Left", "Right")
+
+
+_heart = _pose(_PALM_ON, ((-0.35, -0.05), (-0.3, 0), (-0.25, 0.05)), ((-0.2, -0.45), (-0.35, -0.1), (-0.3, 0.15)),
+               ((-0.05, -0.4), (-0.2, -0.05), (-0.15, 0.15)), ((0, -0.35), (-0.15, -0.05), (-0.1, 0.15)),
+               ((0, -0.3), (-0.1, -0.05), (-0.08, 0.12)))
+_blush = _pose(_EDGE_ON, _THUMB_WRAPPED, _POINTING, _FIST, _FIST, _FIST)
+_fist = _pose(_EDGE_ON, _THUMB_WRAPPED, _FIST, _FIST, _FIST, _FIST)
+
+# Gesture name (matching the detector names) -> (landmarks in palm units, handedness) of its
+# reference pose. One-hand poses are right hands; two-hand poses list the image-left hand first.
+TEMPLATES = {
+    "thumbs_up": (_pose(_EDGE_ON, _THUMB_UP, _FIST, _FIST, _FIST, _FIST)[None], ("Right",)),
+    "peace": (_pose(_PALM_ON, _THUMB_ACROSS, ((-0.1, -0.45), (-0.05, -0.28), (-0.04, -0.22)),
+                    ((0.08, -0.5), (0.05, -0.3), (0.04, -0.24)), _CURLED, _CURLED)[None], ("Right",)),
+    "salute": (_pose(_PALM_ON, _THUMB_ACROSS, _UP, _UP, _UP, _UP, rotate=-80)[None], ("Right",)),
+    "heart": _pair(_heart, 2 * -_heart[INDEX_FINGER_TIP, 0]),
+    "blush": _pair(_blush, 2 * -_blush[INDEX_FINGER_TIP, 0]),
+    "fist_bump": _pair(_fist, 1.7),
+}
+# Each reference pose is also matched tilted by these angles (degrees)
+TEMPLATE_TILTS = (-20, -10, 0, 10, 20)
+
+
+def _orientations(handedness, n_hands):
+    """Whether to mirror each hand, for every combination worth scoring.
+
+    Left hands are mirrored onto right hands; a hand without a known label
+    is scored both ways.
+    """
+    if len(handedness) != n_hands:
+        handedness = [None] * n_hands
+    options = [(label == "Left",) if label in ("Left", "Right") else (False, True) for label in handedness]
+    return np.array(list(itertools.product(*options)), dtype=bool).reshape(-1, n_hands)
+
+
+def gesture_features(xy, handedness=(), aspect=1.0):
+    """Normalized feature vectors of one or two hands, one row per handedness combination.
+
+    Each hand is moved to its wrist, scaled by its palm size and mirrored
+    onto a right hand, leaving 20 landmarks x 2 coordinates of pure hand
+    shape. Two hands are ordered left to right and followed by the
+    weighted offsets between their wrists, thumb tips and index tips.
+    ``aspect`` (width / height) makes x and y distances comparable.
+    """
+    n_hands = len(xy)
+    if n_hands == 2:
+        order = np.argsort(xy[:, WRIST, 0], kind="stable")
+        xy = xy[order]
+        if len(handedness) == 2:
+            handedness = [handedness[i] for i in order]
+    xy = np.asarray(xy, dtype=np.float64) * (aspect, 1.0)
+    relative = xy - xy[:, WRIST:WRIST + 1]
+    palm = np.sqrt((relative[:, PALM_MCPS] ** 2).sum(-1)).mean(-1)
+    palm = np.maximum(palm, 1e-6)
+    shapes = relative / palm[:, None, None]
+
+    mirror = _orientations(list(handedness), n_hands) # (rows, n_hands)
+    signs = np.where(mirror, -1.0, 1.0)
+    oriented = np.repeat(shapes[None, :, 1:], len(mirror), axis=0) # The wrist is always at the origin
+    oriented[..., 0] *= signs[:, :, None]
+    features = oriented.reshape(len(mirror), -1)
+    if n_hands == 2:
+        relation = (xy[1, RELATION_LANDMARKS] - xy[0, RELATION_LANDMARKS]) / palm.mean()
+        relation = np.broadcast_to(relation.ravel() * RELATION_WEIGHT, (len(mirror), relation.size))
+        features = np.hstack([features, relation])
+    return features
+
+
+class GestureClassifier:
+    """Scores every gesture against the current hands in one pass, with NumPy only.
+
+    The hands are normalized for translation, scale and handedness
+    (gesture_features) and compared with every gesture's reference poses
+    at once: one matrix product gives the distance to each template, and a
+    gesture's score is exp(-rms^2 / (2 sigma^2)) of its nearest template,
+    1.0 for an exact match. Templates are kept per hand count, so a frame
+    only pays for the ones that could match it, however many gestures there are.
+
+    The built-in templates are synthetic reference poses (TEMPLATES), which
+    ``bench.py --check-templates`` checks against the detectors' rules at
+    typical palm sizes; poses recorded from a real camera can be added with
+    add_template(), e.g. the landmarks of a LandmarkReplay frame.
+    """
+
+    def __init__(self, sigma=0.25, templates=TEMPLATES, tilts=TEMPLATE_TILTS):
+        self.sigma = sigma # RMS distance in palm units at which a score drops to ~0.6
+        self.names = []
+        self._templates = {} # hand count -> (features (k, d), gesture index (k,))
+        for name, (landmarks, handedness) in templates.items():
+            for tilt in tilts:
+                c, s = np.cos(np.radians(tilt)), np.sin(np.radians(tilt))
+                self.add_template(name, landmarks @ np.array([[c, s], [-s, c]]), handedness)
+
+    def add_template(self, name, landmarks, handedness=(), aspect=1.0):
+        """Adds a reference pose for gesture ``name`` from (n_hands, 21, 2 or 3) normalized landmarks."""
+        xy = np.asarray(landmarks)[..., :2]
+        if name not in self.names:
+            self.names.append(name)
+        features = gesture_features(xy, handedness, aspect)
+        index = np.full(len(features), self.names.index(name))
+        if len(xy) in self._templates:
+            known, indices = self._templates[len(xy)]
+            features, index = np.vstack([known, features]), np.concatenate([indices, index])
+        self._templates[len(xy)] = (features, index)
+
+    def scores(self, landmarks, handedness=(), aspect=1.0):
+        """{gesture name: score in [0, 1]} for (n_hands, 21, 2 or 3) normalized landmarks.
+
+        Gestures with no template for this many hands score 0.
+        """
+        scores = dict.fromkeys(self.names, 0.0)
+        templates = self._templates.get(len(landmarks))
+        if templates is None:
+            return scores
+        features, index = templates
+        query = gesture_features(np.asarray(landmarks)[..., :2], handedness, aspect)
+
+        # Squared distance of every query row to every template in one matrix product
+        distances = (query * query).sum(1)[:, None] - 2 * query @ features.T + (features * features).sum(1)
+        mean_square = np.maximum(distances.min(0), 0) / features.shape[1]
+        template_scores = np.exp(-mean_square / (2 * self.sigma ** 2))
+        best = np.zeros(len(self.names))
+        np.maximum.at(best, index, template_scores)
+        for i in np.flatnonzero(best):
+            scores[self.names[i]] = float(best[i])
+        return scores
@@ -0,0 +1,98 @@
+import numpy as np
+
+# Landmark indices, matching mediapipe.solutions.hands.HandLandmark
+WRIST = 0
+THUMB_CMC, THUMB_MCP, THUMB_IP, THUMB_TIP = 1, 2, 3, 4
+INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_DIP, INDEX_FINGER_TIP = 5, 6, 7, 8
+MIDDLE_FINGER_MCP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_DIP, MIDDLE_FINGER_TIP = 9, 10, 11, 12
+RING_FINGER_MCP, RING_FINGER_PIP, RING_FINGER_DIP, RING_FINGER_TIP = 13, 14, 15, 16
+PINKY_MCP, PINKY_PIP, PINKY_DIP, PINKY_TIP = 17, 18, 19, 20
+NUM_LANDMARKS = 21
+
+# Finger order used by every per-finger feature
+THUMB, INDEX, MIDDLE, RING, PINKY = range(5)
+TIPS = np.array([THUMB_TIP, INDEX_FINGER_TIP, MIDDLE_FINGER_TIP, RING_FINGER_TIP, PINKY_TIP])
+MCPS = np.array([THUMB_MCP, INDEX_FINGER_MCP, MIDDLE_FINGER_MCP, RING_FINGER_MCP, PINKY_MCP])
+PALM_MCPS = np.array([INDEX_FINGER_MCP, MIDDLE_FINGER_MCP, RING_FINGER_MCP, PINKY_MCP])
+# Palm size (mean wrist to knuckle distance, in frame widths) the rule detectors' distance thresholds
+# are written for; a hand about half a metre from a typical webcam
+REFERENCE_PALM_SIZE = 0.12
+PIPS = np.array([THUMB_IP, INDEX_FINGER_PIP, MIDDLE_FINGER_PIP, RING_FINGER_PIP, PINKY_PIP])
+# Wrist-to-tip chain per finger; joint angles are measured at the three inner points
+FINGER_CHAINS = np.array([
+    [WRIST, THUMB_CMC, THUMB_MCP, THUMB_IP, THUMB_TIP],
+    [WRIST, INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_DIP, INDEX_FINGER_TIP],
+    [WRIST, MIDDLE_FINGER_MCP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_DIP, MIDDLE_FINGER_TIP],
+    [WRIST, RING_FINGER_MCP, RING_FINGER_PIP, RING_FINGER_DIP, RING_FINGER_TIP],
+    [WRIST, PINKY_MCP, PINKY_PIP, PINKY_DIP, PINKY_TIP],
+])
+
+
+def landmarks_to_array(multi_hand_landmarks):
+    """Converts MediaPipe ``multi_hand_landmarks`` to an (n_hands, 21, 3) float32 array."""
+    if not multi_hand_landmarks:
+        return np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+    return np.array(
+        [[(p.x, p.y, p.z) for p in hand.landmark] for hand in multi_hand_landmarks],
+        dtype=np.float32,
+    )
+
+
+def _angle(v1, v2):
+    """Unsigned angle in degrees between 2D vectors along the last axis."""
+    dot = (v1 * v2).sum(-1)
+    det = v1[..., 0] * v2[..., 1] - v1[..., 1] * v2[..., 0]
+    return np.degrees(np.abs(np.arctan2(det, dot)))
+
+
+class HandFeatures:
+    """Gesture features for every hand in a frame, computed in one vectorized pass.
+
+    All features use the normalized x/y image coordinates of the landmarks:
+
+    - ``tip_offsets``: (n, 5, 2) fingertip minus MCP per finger
+    - ``distances``: (n, 21, 21) pairwise landmark distances within each hand
+    - ``joint_angles``: (n, 5, 3) angles at the MCP/PIP/DIP joints (180 = straight)
+    - ``inter_hand``: (21, 2) second hand minus first hand per landmark, or None
+    - ``inter_hand_distances``: (21,) norms of ``inter_hand``, or None
+    - ``palm_scale``: (n,) palm size relative to REFERENCE_PALM_SIZE; the rule
+      detectors multiply their distance thresholds by it, so a gesture
+      matches the same way near the camera and far from it
+
+    ``aspect`` is the frame's width / height, to measure palms in frame widths.
+    """
+
+    def __init__(self, landmarks, aspect=1.0):
+        self.landmarks = landmarks
+        self.n_hands = len(landmarks)
+        xy = landmarks[..., :2]
+        self.xy = xy
+
+        knuckles = (xy[:, PALM_MCPS] - xy[:, WRIST:WRIST + 1]) * (aspect, 1.0)
+        palm = np.sqrt((knuckles * knuckles).sum(-1)).mean(-1) / aspect
+        self.palm_scale = palm / REFERENCE_PALM_SIZE
+
+        self.tip_offsets = xy[:, TIPS] - xy[:, MCPS]
+
+        diff = xy[:, :, None, :] - xy[:, None, :, :]
+        self.distances = np.sqrt((diff * diff).sum(-1))
+
+        chains = xy[:, FINGER_CHAINS]
+        joints = chains[:, :, 1:-1]
+        self.joint_angles = _angle(chains[:, :, :-2] - joints, chains[:, :, 2:] - joints)
+
+        if self.n_hands == 2:
+            self.inter_hand = xy[1] - xy[0]
+            self.inter_hand_distances = np.sqrt((self.inter_hand * self.inter_hand).sum(-1))
+        else:
+            self.inter_hand = None
+            self.inter_hand_distances = None
+
+    def angle_at(self, center, a, b):
+        """Angle in degrees at landmark ``center`` between landmarks ``a`` and ``b``, for every hand."""
+        xy = self.xy
+        return _angle(xy[:, a] - xy[:, center], xy[:, b] - xy[:, center])
+
+    def order_by_x(self, landmark):
+        """Hand indices sorted left to right by the x of ``landmark``."""
+        return np.argsort(self.xy[:, landmark, 0], kind="stable")
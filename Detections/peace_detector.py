@@ -1,56 +1,50 @@
-import mediapipe as mp
 from .base_detector import BaseDetector
-
-mp_hands = mp.solutions.hands
+from .hand_features import INDEX, MIDDLE, RING, THUMB_TIP, INDEX_FINGER_TIP, TIPS, PIPS, MCPS
 
 class PeaceDetector(BaseDetector):
+    name = "peace"
+    required_hands = 1
+    tunables = BaseDetector.tunables + ("effect_duration",)
+    emoji_path = "assets/peace.png"
+
     def __init__(self, emoji_spawner, reaction_manager):
-        super().__init__(emoji_spawner)
-        self.reaction_manager = reaction_manager # Store the ReactionManager instance
+        super().__init__(emoji_spawner, reaction_manager)
         self.is_effect_active = False
         self.effect_duration = 15 # frames (adjust as needed)
         self.current_effect_frame = 0
 
-    def detect(self, hands, frame):
-        # If another reaction is active, do not perform detection
-        if self.reaction_manager.is_reaction_active():
-            return
-
-        if not hands or len(hands) != 1:
-            return
-
-        lm = hands[0].landmark
+    def matches_rules(self, perception):
+        features = perception.features
+        y = features.xy[0, :, 1]
 
-        # 1. Index and middle finger extended (tip above MCP and PIP)
-        index_extended = (
-            lm[mp_hands.HandLandmark.INDEX_FINGER_TIP].y < lm[mp_hands.HandLandmark.INDEX_FINGER_PIP].y and
-            lm[mp_hands.HandLandmark.INDEX_FINGER_PIP].y < lm[mp_hands.HandLandmark.INDEX_FINGER_MCP].y
-        )
-
-        middle_extended = (
-            lm[mp_hands.HandLandmark.MIDDLE_FINGER_TIP].y < lm[mp_hands.HandLandmark.MIDDLE_FINGER_PIP].y and
-            lm[mp_hands.HandLandmark.MIDDLE_FINGER_PIP].y < lm[mp_hands.HandLandmark.MIDDLE_FINGER_MCP].y
-        )
+        # 1. Index and middle finger extended (tip above PIP, PIP above MCP)
+        fingers = slice(INDEX, MIDDLE + 1)
+        extended = (y[TIPS[fingers]] < y[PIPS[fingers]]) & (y[PIPS[fingers]] < y[MCPS[fingers]])
 
         # 2. Ring and pinky curled (tip clearly below MCP)
-        ring_curled = lm[mp_hands.HandLandmark.RING_FINGER_TIP].y > lm[mp_hands.HandLandmark.RING_FINGER_MCP].y + 0.02
-        pinky_curled = lm[mp_hands.HandLandmark.PINKY_TIP].y > lm[mp_hands.HandLandmark.PINKY_MCP].y + 0.02
-        
+        curled = features.tip_offsets[0, RING:, 1] > 0.02 * features.palm_scale[0]
+
         # 3. Optional: Thumb not interfering (thumb tip not above index tip)
-        thumb_neutral = lm[mp_hands.HandLandmark.THUMB_TIP].y > lm[mp_hands.HandLandmark.INDEX_FINGER_TIP].y
+        thumb_neutral = y[THUMB_TIP] > y[INDEX_FINGER_TIP]
 
-        if index_extended and middle_extended and ring_curled and pinky_curled and thumb_neutral:
+        return bool(extended.all() and curled.all() and thumb_neutral)
+
+    def detect(self, perception, frame):
+        if self.matches(perception):
             if not self.is_effect_active:
                 print("PeaceDetector: Peace sign detected!")
                 self.is_effect_active = True
                 self.current_effect_frame = self.effect_duration
-                self.reaction_manager.set_reaction_active(True) # Set reaction active
+                self.reaction_manager.start_reaction(self)
+
+    def preload(self, frame_shape):
+        self.emoji_spawner.preload_fountain_emojis(self.emoji_path)
 
-    def apply_effect(self, frame, hands_landmarks):
+    def apply_effect(self, frame, perception):
         if self.current_effect_frame > 0:
             # Spawn emojis during the effect duration
-            self.emoji_spawner.spawn_fountain_emojis(frame, "assets/peace.png")
+            self.emoji_spawner.spawn_fountain_emojis(frame, self.emoji_path)
             self.current_effect_frame -= 1
             if self.current_effect_frame == 0:
                 self.is_effect_active = False
-                self.reaction_manager.set_reaction_active(False) # Set reaction inactive when effect ends
+                self.reaction_manager.end_reaction(self)
@@ -1,145 +1,145 @@
-import mediapipe as mp
 from .base_detector import BaseDetector
-from .face_detector import FaceDetector # Import FaceDetector
+from .hand_features import WRIST, INDEX_FINGER_MCP, INDEX_FINGER_TIP
+import threading
 import cv2
 import numpy as np
-
-mp_hands = mp.solutions.hands
+from compositing import Sprite, blend
 
 class SaluteDetector(BaseDetector):
+    name = "salute"
+    required_hands = 1
+    requires_face = True
+    tunables = BaseDetector.tunables + ("effect_duration", "hand_flat_horizontal_threshold",
+                                        "wrist_near_eye_level_threshold", "wrist_aligned_with_face_threshold")
+
     def __init__(self, emoji_spawner, reaction_manager):
-        self.face_detector = FaceDetector() # Instantiate FaceDetector
-        super().__init__(emoji_spawner)
-        self.reaction_manager = reaction_manager
+        super().__init__(emoji_spawner, reaction_manager)
         self.is_effect_active = False
         self.effect_duration = 60 # frames
         self.current_effect_frame = 0
         # Thresholds for salute detection
-        self.hand_flat_horizontal_threshold = 0.04
+        self.hand_flat_horizontal_threshold = 0.04 # At the reference palm size
         self.wrist_near_eye_level_threshold = 0.04
         self.wrist_aligned_with_face_threshold = 0.5
         self.salute_image_path = "assets/salute.png"
-        self.salute_image = cv2.imread(self.salute_image_path, cv2.IMREAD_UNCHANGED)
-        if self.salute_image is None:
+        self._overlay = None # (sprite, x, y), prepared once per output resolution
+        self._overlay_size = None
+        self._overlay_lock = threading.Lock() # preload() builds the overlay on another thread
+
+    def get_overlay(self, frame_width, frame_height):
+        """Returns the salute overlay for this output resolution as (sprite, x, y), or None if the asset is missing.
+
+        The image is scaled to cover the frame, center-cropped to it, trimmed
+        to its visible pixels and premultiplied once; the full-size decoded
+        image is dropped straight after, so each frame only pays for a
+        scalar-alpha blend.
+        """
+        with self._overlay_lock:
+            if self._overlay_size != (frame_width, frame_height):
+                self._overlay = self._build_overlay(frame_width, frame_height)
+                self._overlay_size = (frame_width, frame_height)
+            return self._overlay
+
+    def _build_overlay(self, frame_width, frame_height):
+        salute_image = cv2.imread(self.salute_image_path, cv2.IMREAD_UNCHANGED)
+        if salute_image is None:
             print(f"Error loading image: {self.salute_image_path}")
-        else:
-            # Ensure image has an alpha channel for transparency
-            if self.salute_image.shape[2] == 3:
-                self.salute_image = cv2.cvtColor(self.salute_image, cv2.COLOR_BGR2BGRA)
+            return None
+        # Ensure image has an alpha channel for transparency
+        if salute_image.shape[2] == 3:
+            salute_image = cv2.cvtColor(salute_image, cv2.COLOR_BGR2BGRA)
+
+        # Resize image to cover the whole frame while maintaining aspect ratio
+        img_height, img_width = salute_image.shape[:2]
+        scale = max(frame_width / img_width, frame_height / img_height)
+        target_width = max(int(img_width * scale), frame_width)
+        target_height = max(int(img_height * scale), frame_height)
+        resized = cv2.resize(salute_image, (target_width, target_height), interpolation=cv2.INTER_AREA)
+        del salute_image
+
+        # Keep only the centered part that lands on the frame
+        crop_x = (target_width - frame_width) // 2
+        crop_y = (target_height - frame_height) // 2
+        cropped = resized[crop_y:crop_y + frame_height, crop_x:crop_x + frame_width]
+
+        # Trim fully transparent borders
+        visible = cropped[:, :, 3] > 0
+        rows = np.flatnonzero(visible.any(axis=1))
+        cols = np.flatnonzero(visible.any(axis=0))
+        if len(rows) == 0:
+            return None
+        x0, x1, y0, y1 = cols[0], cols[-1] + 1, rows[0], rows[-1] + 1
+        return Sprite.from_bgra(cropped[y0:y1, x0:x1]), int(x0), int(y0)
+
+    def preload(self, frame_shape):
+        frame_height, frame_width = frame_shape[:2]
+        self.get_overlay(frame_width, frame_height)
+
+    def matches(self, perception):
+        """Checks the current hand and face for a salute pose."""
+        # Check if one hand and at least one face are detected
+        if perception.num_hands != 1 or not perception.faces:
+            return False
+        # The classifier only sees the hand, so where it is relative to the face is always checked here
+        return super().matches(perception) and self.is_at_eye_level(perception)
 
+    def matches_rules(self, perception):
+        features = perception.features
+        xy = features.xy[0]
 
-    def detect(self, hands, frame): # Removed 'faces' parameter
-        is_salute = False # Flag to indicate if salute is currently detected
+        # Get hand landmarks
+        index_tip = xy[INDEX_FINGER_TIP]
+        wrist = xy[WRIST]
+        index_mcp = xy[INDEX_FINGER_MCP]
 
-        if self.reaction_manager.is_reaction_active() and not self.is_effect_active:
-            # If another reaction is active and this effect is not, do not perform detection
-            return
+        # Refined checks for a potential salute pose
+        # 1. Hand is relatively flat (e.g., index finger tip and wrist are somewhat aligned horizontally)
+        hand_flat_horizontal = abs(index_tip[1] - wrist[1]) < self.hand_flat_horizontal_threshold * features.palm_scale[0]
 
-        # Perform face detection using the internal FaceDetector
-        faces = self.face_detector.detect(frame)
+        # 2. Fingers are relatively straight (e.g., index finger tip is above its MCP)
+        fingers_straight = index_tip[1] < index_mcp[1]
 
-        # Check if one hand and at least one face are detected
-        if hands and len(hands) == 1 and faces and len(faces) > 0: # Check if faces list is not empty
-            hand_lm = hands[0].landmark
-            face_data = faces[0] # Get the first detected face data (a dictionary)
-
-            # Get hand landmarks
-            index_tip = hand_lm[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-            wrist = hand_lm[mp_hands.HandLandmark.WRIST]
-            index_mcp = hand_lm[mp_hands.HandLandmark.INDEX_FINGER_MCP]
-
-            # Get face keypoints (eyes) from the face data dictionary
-            # Indices 0 and 1 are typically right and left eye respectively for MediaPipe Face Detection keypoints
-            face_keypoints = face_data["keypoints"]
-            right_eye_kp = face_keypoints[0]
-            left_eye_kp = face_keypoints[1]
-
-            # Convert keypoint tuples to normalized coordinates for consistency with hand landmarks
-            frame_height, frame_width, _ = frame.shape
-            left_eye_norm = type('obj', (object,), {'x': left_eye_kp[0] / frame_width, 'y': left_eye_kp[1] / frame_height})()
-            right_eye_norm = type('obj', (object,), {'x': right_eye_kp[0] / frame_width, 'y': right_eye_kp[1] / frame_height})()
+        return bool(hand_flat_horizontal and fingers_straight)
 
+    def is_at_eye_level(self, perception):
+        """Checks that the wrist is level with the eyes and in line with the face."""
+        wrist = perception.features.xy[0, WRIST]
+        face_data = perception.face # Get the first detected face data (a dictionary)
 
-            # Calculate average eye level and face center x-coordinate using normalized coordinates
-            avg_eye_y = (left_eye_norm.y + right_eye_norm.y) / 2
-            face_center_x = (left_eye_norm.x + right_eye_norm.x) / 2
+        # Get face keypoints (eyes) from the face data dictionary
+        # Indices 0 and 1 are typically right and left eye respectively for MediaPipe Face Detection keypoints
+        face_keypoints = face_data["keypoints"]
+        right_eye_kp = face_keypoints[0]
+        left_eye_kp = face_keypoints[1]
 
-            # Refined checks for a potential salute pose
-            # 1. Hand is relatively flat (e.g., index finger tip and wrist are somewhat aligned horizontally)
-            hand_flat_horizontal = abs(index_tip.y - wrist.y) < self.hand_flat_horizontal_threshold
+        # Calculate average eye level and face center x-coordinate in normalized coordinates,
+        # for consistency with hand landmarks
+        avg_eye_y = (left_eye_kp[1] + right_eye_kp[1]) / 2 / perception.height
+        face_center_x = (left_eye_kp[0] + right_eye_kp[0]) / 2 / perception.width
 
-            # 2. Wrist is near the average eye level
-            wrist_near_eye_level = abs(wrist.y - avg_eye_y) < self.wrist_near_eye_level_threshold # Threshold may need tuning
+        # 3. Wrist is near the average eye level
+        wrist_near_eye_level = abs(wrist[1] - avg_eye_y) < self.wrist_near_eye_level_threshold # Threshold may need tuning
 
-            # 3. Wrist is horizontally aligned with the face center
-            wrist_aligned_with_face = abs(wrist.x - face_center_x) < self.wrist_aligned_with_face_threshold # Threshold may need tuning
+        # 4. Wrist is horizontally aligned with the face center
+        wrist_aligned_with_face = abs(wrist[0] - face_center_x) < self.wrist_aligned_with_face_threshold # Threshold may need tuning
 
-            # 4. Fingers are relatively straight (e.g., index finger tip is above its MCP)
-            fingers_straight = index_tip.y < index_mcp.y
+        return bool(wrist_near_eye_level and wrist_aligned_with_face)
 
-            # Combine conditions
-            if hand_flat_horizontal and wrist_near_eye_level and fingers_straight and wrist_aligned_with_face:
-                 is_salute = True
-        if is_salute and not self.is_effect_active:
+    def detect(self, perception, frame):
+        if self.matches(perception) and not self.is_effect_active:
             print("SaluteDetector: Salute detected!")
             self.is_effect_active = True
             self.current_effect_frame = self.effect_duration
-            self.reaction_manager.set_reaction_active(True)
-        elif not is_salute and self.is_effect_active:
-             # If salute is no longer detected and effect is active, start fading out
-             # The fade out will be handled in apply_effect by the frame counter
-             pass # No change needed here, apply_effect handles the countdown
+            self.reaction_manager.start_reaction(self)
+        # If salute is no longer detected while the effect is active, apply_effect fades it out
 
 
-    def apply_effect(self, frame, hands_landmarks, faces_landmarks): # Keep faces_landmarks parameter for consistency with reactions.py call
-        if self.is_effect_active and self.salute_image is not None:
+    def apply_effect(self, frame, perception):
+        if self.is_effect_active:
             frame_height, frame_width, _ = frame.shape
-            img_height, img_width, _ = self.salute_image.shape
-
-            # Resize image to cover the whole frame while maintaining aspect ratio
-            scale_width = frame_width / img_width
-            scale_height = frame_height / img_height
-            scale = max(scale_width, scale_height)
-
-            target_width = int(img_width * scale)
-            target_height = int(img_height * scale)
-
-            resized_salute_image = cv2.resize(self.salute_image, (target_width, target_height), interpolation=cv2.INTER_AREA)
-
-            # Calculate the position to center the resized image
-            x_offset = (frame_width - target_width) // 2
-            y_offset = (frame_height - target_height) // 2
 
             # Determine if salute gesture is still present
-            is_salute_present = False
-            # Check if one hand and at least one face are detected (using the passed faces_landmarks)
-            if hands_landmarks and len(hands_landmarks) == 1 and faces_landmarks and len(faces_landmarks) > 0: # Check if faces_landmarks list is not empty
-                hand_lm = hands_landmarks[0].landmark
-                face_detection = faces_landmarks[0] # Get the first detected face (a MediaPipe Detection object)
-
-                # Get hand landmarks
-                index_tip = hand_lm[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-                wrist = hand_lm[mp_hands.HandLandmark.WRIST]
-                index_mcp = hand_lm[mp_hands.HandLandmark.INDEX_FINGER_MCP]
-
-                # Get face landmarks (eyes) from the MediaPipe Detection object
-                # Indices 0 and 1 are typically right and left eye respectively for MediaPipe Face Detection keypoints
-                right_eye = face_detection.location_data.relative_keypoints[0]
-                left_eye = face_detection.location_data.relative_keypoints[1]
-
-                # Calculate average eye level and face center x-coordinate using normalized coordinates
-                avg_eye_y = (left_eye.y + right_eye.y) / 2
-                face_center_x = (left_eye.x + right_eye.x) / 2
-
-                # Refined checks for a potential salute pose (same as in detect)
-                hand_flat_horizontal = abs(index_tip.y - wrist.y) < self.hand_flat_horizontal_threshold
-                wrist_near_eye_level = abs(wrist.y - avg_eye_y) < self.wrist_near_eye_level_threshold # Threshold may need tuning
-                wrist_aligned_with_face = abs(wrist.x - face_center_x) < self.wrist_aligned_with_face_threshold # Threshold may need tuning
-
-                fingers_straight = index_tip.y < index_mcp.y
-
-                if hand_flat_horizontal and wrist_near_eye_level and fingers_straight and wrist_aligned_with_face:
-                    is_salute_present = True
+            is_salute_present = self.matches(perception)
 
             # Adjust alpha based on whether salute is present and effect duration
             if is_salute_present:
@@ -157,22 +157,11 @@ class SaluteDetector(BaseDetector):
             # If alpha reaches 0 and salute is not present, end the effect
             if alpha <= 0 and not is_salute_present:
                  self.is_effect_active = False
-                 self.reaction_manager.set_reaction_active(False)
+                 self.reaction_manager.end_reaction(self)
                  self.current_effect_frame = 0 # Reset frame counter
 
-            # Extract the alpha channel from the resized image
-            alpha_s = resized_salute_image[:, :, 3] / 255.0 * alpha
-            alpha_l = 1.0 - alpha_s
-
             # Overlay the image onto the frame with gradual alpha blending
-            y1, y2 = max(0, y_offset), min(frame_height, y_offset + target_height)
-            x1, x2 = max(0, x_offset), min(frame_width, x_offset + target_width)
-
-            img_y1 = max(0, -y_offset)
-            img_y2 = img_y1 + (y2 - y1)
-            img_x1 = max(0, -x_offset)
-            img_x2 = img_x1 + (x2 - x1)
-
-            for c in range(0, 3):
-                frame[y1:y2, x1:x2, c] = (alpha_s[img_y1:img_y2, img_x1:img_x2] * resized_salute_image[img_y1:img_y2, img_x1:img_x2, c] +
-                                          alpha_l[img_y1:img_y2, img_x1:img_x2] * frame[y1:y2, x1:x2, c])
\ No newline at end of file
+            overlay = self.get_overlay(frame_width, frame_height)
+            if overlay is not None:
+                sprite, x, y = overlay
+                blend(frame, sprite, x, y, int(round(alpha * 255)))
@@ -0,0 +1,317 @@
+"""Offline benchmark for Reactions.process_frame, no webcam or virtual camera needed.
+
+Scripted scenarios feed synthetic frames with scripted hand landmarks and
+faces through the detectors and effects, so each gesture fires exactly as
+it would live; inference is skipped. With --replay, the landmarks of a
+LandmarkRecorder file (main.py's RECORD_LANDMARKS) drive them instead.
+With --video, the frames of a recorded video also run through the full
+pipeline including MediaPipe inference.
+
+    python bench.py                        # every scripted scenario
+    python bench.py idle heart --repeat 5  # a subset, five times longer
+    python bench.py --replay session.rxlm --output before.json
+    python bench.py --video clip.mp4
+    python bench.py --video clip.mp4 --inference-backend process
+    python bench.py --check-templates      # templates vs. detector rules, no timing
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import platform
+import sys
+import time
+
+os.environ['GLOG_minloglevel'] = '2'
+
+import cv2
+import numpy as np
+
+from Detections.gesture_classifier import TEMPLATES, GestureClassifier
+from Detections.hand_features import WRIST, REFERENCE_PALM_SIZE
+from inference import InferenceEngine
+from landmark_recording import LandmarkReplay
+from perception import Perception
+from reactions import DETECTORS, Reactions
+from stage_timing import stage_timings
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+FRAME_SIZE = (640, 480)
+
+
+def _placed(gesture, palm=REFERENCE_PALM_SIZE, wrist=(0.5, 0.7), size=FRAME_SIZE):
+    """(n_hands, 21, 3) landmarks of the gesture's GestureClassifier template with ``palm`` frame widths
+    palms, its wrists centred on ``wrist``."""
+    hands, _ = TEMPLATES[gesture]
+    w, h = size
+    landmarks = np.zeros(hands.shape[:2] + (3,), dtype=np.float32)
+    landmarks[..., 0] = hands[..., 0] * palm
+    landmarks[..., 1] = hands[..., 1] * palm * w / h
+    landmarks[..., :2] += np.asarray(wrist) - landmarks[:, WRIST, :2].mean(0)
+    return landmarks
+
+
+# Landmarks that make each detector fire, as (n_hands, 21, 3) normalized arrays
+GESTURES = {
+    "none": np.zeros((0, 21, 3), dtype=np.float32),
+    **{name: _placed(name) for name in TEMPLATES if name != "salute"},
+    "salute": _placed("salute", wrist=(0.3, 0.3)), # At FACE's eye level
+}
+# Palm sizes, in frame widths, from a hand at arm's length to one close to the camera
+TYPICAL_PALM_SIZES = (0.06, 0.08, 0.1, 0.12, 0.15, 0.2)
+
+# A face in the upper left quarter of a 640x480 frame, in FaceDetector.detect's format
+FACE = {"bbox": (160, 96, 96, 120),
+        "keypoints": [(179, 144), (205, 144), (192, 182), (192, 202), (160, 154), (224, 154)]}
+
+# Scenario name -> (settings applied to Reactions, [(gesture, frames), ...])
+SCENARIOS = {
+    "idle": ({}, [("none", 120)]),
+    "thumbs_up": ({}, [("thumbs_up", 16), ("none", 104)]),
+    "peace": ({}, [("peace", 16), ("none", 104)]),
+    "heart": ({}, [("heart", 31), ("none", 89)]),
+    "blush": ({}, [("blush", 41), ("none", 79)]),
+    "fist_bump": ({}, [("fist_bump", 20), ("none", 100)]),
+    "salute": ({}, [("salute", 61), ("none", 59)]),
+    # Back to back reactions, so particles, smoke and overlays are all on screen at once
+    "overlapping": ({}, [("thumbs_up", 16), ("heart", 31), ("fist_bump", 20), ("blush", 41),
+                     ("salute", 61), ("none", 60)]),
+    # A thumbs up held long enough, with a heavy spawn rate, to fill the particle system
+    "peak_particles": ({"emojis_per_frame": 32}, [("thumbs_up", 150), ("none", 30)]),
+}
+
+
+def synthetic_background(rng, size=FRAME_SIZE):
+    """A noisy gradient, so blending works on realistic, non-uniform pixels."""
+    w, h = size
+    gradient = np.linspace(40, 200, w, dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 12, (h, w, 3))
+    return np.clip(gradient + noise, 0, 255).astype(np.uint8)
+
+
+def scripted_perception(gesture, rng, jitter=0.002, size=FRAME_SIZE):
+    """A Perception with the gesture's landmarks, slightly jittered, and FACE."""
+    landmarks = GESTURES[gesture]
+    landmarks = landmarks + rng.normal(0, jitter, landmarks.shape).astype(np.float32)
+    w, h = size
+    return Perception(None, None, [FACE], (h, w, 3), landmarks)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far. It never goes down, see run_isolated()."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(latencies, elapsed, **extra):
+    latencies = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "frames": len(latencies),
+        "fps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(latencies.max()), 3),
+        "peak_rss_mb": peak_rss_mb(),
+        **extra,
+    }
+
+
+def stage_summary():
+    """{"stages": ...} with the stage timings since the last call, or {} when they are off."""
+    if not stage_timings.enabled:
+        return {}
+    stages = stage_timings.summary()
+    stage_timings.reset()
+    return {"stages": stages}
+
+
+def format_result(name, r):
+    line = (f"{name:15s} {r['fps']:8.1f} fps  p50 {r['p50_ms']:6.2f} ms  p95 {r['p95_ms']:6.2f} ms  "
+            f"p99 {r['p99_ms']:6.2f} ms  peak RSS {r['peak_rss_mb']} MB  reactions {r['reactions']}")
+    if "stages" in r:
+        line += "\n" + "\n".join(f"    {stage:22s} p50 {s['p50_ms']:6.3f}  p95 {s['p95_ms']:6.3f}  p99 {s['p99_ms']:6.3f}  "
+                                  f"max {s['max_ms']:6.3f} ms" for stage, s in r["stages"].items())
+    return line
+
+
+def run_perceptions(reactions, background, perceptions):
+    """Times process_frame on a fresh copy of ``background`` for each of ``perceptions``."""
+    frame = np.empty_like(background)
+    latencies = []
+    fired = []
+    max_particles = 0
+    started = time.perf_counter()
+    for perception in perceptions:
+        np.copyto(frame, background) # Stands in for the camera read
+        t = time.perf_counter()
+        reactions.process_frame(frame, perception)
+        latencies.append(time.perf_counter() - t)
+
+        active = reactions.reaction_manager.active_detector
+        if active is not None and (not fired or fired[-1] != active.name):
+            fired.append(active.name)
+        max_particles = max(max_particles, reactions.particles.count)
+    elapsed = time.perf_counter() - started
+    reactions.close()
+    return summarize(latencies, elapsed, reactions=fired, max_particles=max_particles, **stage_summary())
+
+
+def _run_in_child(target, args, timings):
+    stage_timings.enabled = timings
+    return target(*args)
+
+
+def run_isolated(target, *args):
+    """Runs a benchmark in a fresh process, so its peak_rss_mb covers that benchmark alone.
+
+    ru_maxrss is a high-water mark for the whole process; measured in one
+    process, every scenario would report the peak of all the ones before it.
+    """
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_run_in_child, target, args, stage_timings.enabled).result()
+
+
+def run_scenario(name, seed=0, repeat=1):
+    settings, script = SCENARIOS[name]
+    np.random.seed(seed) # Particle spawning uses the global RNG
+    rng = np.random.default_rng(seed)
+    reactions = Reactions()
+    for key, value in settings.items():
+        setattr(reactions, key, value)
+
+    background = synthetic_background(rng)
+    perceptions = (scripted_perception(gesture, rng)
+                   for _ in range(repeat) for gesture, frames in script for _ in range(frames))
+    return run_perceptions(reactions, background, perceptions)
+
+
+def run_replay(path, seed=0, repeat=1):
+    """Detectors and effects driven by the landmarks and faces of a LandmarkRecorder file."""
+    replay = LandmarkReplay(path)
+    if not len(replay):
+        raise SystemExit(f"No frames in recording: {path}")
+    np.random.seed(seed)
+    height, width = replay.frame_shape[:2]
+    background = synthetic_background(np.random.default_rng(seed), (width, height))
+    perceptions = (perception for _ in range(repeat) for perception in replay)
+    return run_perceptions(Reactions(), background, perceptions)
+
+
+def run_video(path, max_frames=None, backend="inline"):
+    """Full process_frame, MediaPipe inference included, over the frames of a video file."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open video: {path}")
+    reactions = Reactions(inference_backend=backend)
+    frame = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    reactions.inference.warm_up(frame.shape) # Graph setup (and worker startup) is not per-frame cost
+    latencies = []
+    fired = []
+    started = time.perf_counter()
+    while max_frames is None or len(latencies) < max_frames:
+        ret, source = cap.read()
+        if not ret:
+            break
+        cv2.resize(source, FRAME_SIZE, dst=frame)
+        t = time.perf_counter()
+        reactions.process_frame(frame)
+        latencies.append(time.perf_counter() - t)
+
+        active = reactions.reaction_manager.active_detector
+        if active is not None and (not fired or fired[-1] != active.name):
+            fired.append(active.name)
+    elapsed = time.perf_counter() - started
+    cap.release()
+    reactions.close()
+    if not latencies:
+        raise SystemExit(f"No frames in video: {path}")
+    return summarize(latencies, elapsed, reactions=fired, inference=reactions.inference.stats(), **stage_summary())
+
+
+def check_templates(size=FRAME_SIZE):
+    """Whether every GestureClassifier template matches its detector, by its rules and by the
+    classifier, at each of TYPICAL_PALM_SIZES. Prints a line per gesture."""
+    w, h = size
+    classifier = GestureClassifier()
+    detectors = {detector_class.name: detector_class(None, None) for detector_class in DETECTORS}
+    ok = True
+    for name, (_, handedness) in TEMPLATES.items():
+        detector = detectors[name]
+        failed = []
+        for palm in TYPICAL_PALM_SIZES:
+            landmarks = _placed(name, palm)
+            perception = Perception(None, None, [FACE], (h, w, 3), landmarks, list(handedness))
+            score = classifier.scores(landmarks, handedness, w / h)[name]
+            if not detector.matches_rules(perception):
+                failed.append(f"rules at {palm}")
+            if score < detector.score_threshold:
+                failed.append(f"classifier at {palm} ({score:.2f})")
+        ok = ok and not failed
+        print(f"{name:15s} {'ok' if not failed else 'FAILED: ' + ', '.join(failed)}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*",
+                        help=f"Scripted scenarios to run, of {', '.join(SCENARIOS)} (default: all, unless --replay or --video is given)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Play each scenario's script this many times")
+    parser.add_argument("--replay", help="Also benchmark the detectors and effects on this landmark recording")
+    parser.add_argument("--video", help="Also benchmark the full pipeline on this video file")
+    parser.add_argument("--max-frames", type=int, help="Stop the video benchmark after this many frames")
+    parser.add_argument("--inference-backend", default="inline", choices=InferenceEngine.BACKENDS,
+                        help="Where the video benchmark runs the hands and face graphs")
+    parser.add_argument("--stage-timings", action="store_true", help="Also report per-stage latencies")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--check-templates", action="store_true",
+                        help="Only check that each gesture template matches its detector at typical palm sizes")
+    args = parser.parse_args(argv)
+    if args.check_templates:
+        sys.exit(0 if check_templates() else 1)
+    stage_timings.enabled = args.stage_timings
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    names = args.scenarios or ([] if args.video or args.replay else list(SCENARIOS))
+    results = {}
+    for name in names:
+        results[name] = run_isolated(run_scenario, name, args.seed, args.repeat)
+        print(format_result(name, results[name]))
+    if args.replay:
+        results["replay"] = run_isolated(run_replay, args.replay, args.seed, args.repeat)
+        print(format_result("replay", results["replay"]))
+    if args.video:
+        results["video"] = run_isolated(run_video, args.video, args.max_frames, args.inference_backend)
+        print(format_result("video", results["video"]))
+
+    if args.output:
+        report = {
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "frame_size": FRAME_SIZE,
+            "peak_rss_mb": "ru_maxrss of a fresh process per scenario, imports included",
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "scenarios": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import threading
+
+import cv2
+import numpy as np
+
+_scratch = threading.local()
+
+MIN_OVERDRAW = 2.0 # Sprite pixels per pixel of their bounding box below which blend_many() blends sprites one by one
+
+
+class Sprite:
+    """BGRA image stored premultiplied: ``color`` is BGR * alpha / 255 and ``inv_alpha`` is 255 - alpha."""
+
+    __slots__ = ("color", "alpha", "inv_alpha", "opaque")
+
+    def __init__(self, color, alpha):
+        self.color = color
+        self.alpha = alpha
+        self.inv_alpha = 255 - alpha
+        self.opaque = bool((alpha == 255).all()) # Lets blend() skip the per-pixel alpha entirely
+        for arr in (self.color, self.alpha, self.inv_alpha):
+            arr.flags.writeable = False
+
+    @classmethod
+    def from_bgra(cls, bgra):
+        alpha = bgra[:, :, 3:4]
+        color = np.multiply(bgra[:, :, :3], alpha, dtype=np.uint16)
+        return cls(_div255(color).astype(np.uint8), np.ascontiguousarray(alpha))
+
+    @property
+    def shape(self):
+        return self.color.shape[:2]
+
+    @property
+    def nbytes(self):
+        return self.color.nbytes + self.alpha.nbytes + self.inv_alpha.nbytes
+
+
+def _div255(x):
+    """Rounded x / 255 for uint16 ``x`` in [0, 255 * 255], in place."""
+    x += 128
+    x += x >> 8
+    x >>= 8
+    return x
+
+
+def _buffer(shape):
+    """Returns a uint16 scratch array of ``shape`` reused across calls on this thread."""
+    size = int(np.prod(shape))
+    buf = getattr(_scratch, "buf", None)
+    if buf is None or buf.size < size:
+        buf = _scratch.buf = np.empty(size, dtype=np.uint16)
+    return buf[:size].reshape(shape)
+
+
+def clip(dst_shape, src_shape, x, y):
+    """Returns (dst slices, src slices) of the visible part of a src placed at (x, y), or None if off-screen."""
+    dh, dw = dst_shape[:2]
+    sh, sw = src_shape[:2]
+    x1, y1 = max(x, 0), max(y, 0)
+    x2, y2 = min(x + sw, dw), min(y + sh, dh)
+    if x1 >= x2 or y1 >= y2:
+        return None
+    return (
+        (slice(y1, y2), slice(x1, x2)),
+        (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x)),
+    )
+
+
+def blend(dst, sprite, x, y, opacity=255):
+    """Composites a premultiplied ``sprite`` over the BGR ``dst`` in place with its top-left at (x, y).
+
+    Sprites hanging partly off the frame are clipped. ``opacity`` (0-255)
+    scales the whole sprite, which is how effects fade in and out.
+    """
+    region = clip(dst.shape, sprite.shape, x, y)
+    if region is None or opacity <= 0:
+        return
+    (dy, dx), (sy, sx) = region
+    roi = dst[dy, dx]
+    color = sprite.color[sy, sx]
+
+    if sprite.opaque:
+        if opacity >= 255:
+            np.copyto(roi, color)
+        else:
+            # Scalar alpha only, one vectorized pass
+            cv2.addWeighted(color, opacity / 255.0, roi, 1.0 - opacity / 255.0, 0, dst=roi)
+        return
+
+    inv_alpha = sprite.inv_alpha[sy, sx]
+
+    if opacity < 255:
+        color = _div255(np.multiply(color, opacity, dtype=np.uint16))
+        inv_alpha = 255 - _div255(np.multiply(sprite.alpha[sy, sx], opacity, dtype=np.uint16))
+
+    out = _buffer(roi.shape)
+    np.multiply(roi, inv_alpha, out=out, dtype=np.uint16)
+    _div255(out)
+    out += color
+    np.copyto(roi, out, casting="unsafe")
+
+
+def blend_color(dst, alpha, color, x, y):
+    """Composites a solid BGR ``color`` through a uint8 ``alpha`` layer onto ``dst`` in place at (x, y)."""
+    region = clip(dst.shape, alpha.shape, x, y)
+    if region is None:
+        return
+    (dy, dx), (sy, sx) = region
+    roi = dst[dy, dx]
+    a = alpha[sy, sx, None]
+
+    out = _buffer(roi.shape)
+    np.multiply(roi, 255 - a, out=out, dtype=np.uint16)
+    out += np.multiply(a, np.asarray(color, dtype=np.uint16))
+    _div255(out)
+    np.copyto(roi, out, casting="unsafe")
+
+
+def _blend_each(dst, sprites, ids, xs, ys):
+    for sprite_id, x, y in zip(ids.tolist(), xs.tolist(), ys.tolist()):
+        if sprites[sprite_id] is not None:
+            blend(dst, sprites[sprite_id], x, y)
+
+
+def blend_many(dst, sprites, ids, xs, ys):
+    """Composites ``sprites[ids[i]]`` at every (xs[i], ys[i]) in index order, as one blend() per sprite would.
+
+    Rather than walking the sprites one by one, every covered pixel is
+    handled at once: all layers under the topmost opaque sprite pixel are
+    dropped, and the translucent layers left above it are composited bottom
+    to top, one vectorized pass per layer. The result is identical to the
+    blend() loop; the cost follows the covered area instead of the sprite
+    count, which pays off when many sprites pile up. Sparse sprites
+    (MIN_OVERDRAW) are blended one by one. None sprites are skipped.
+    """
+    n = len(ids)
+    if n == 0:
+        return
+    if not dst.flags.c_contiguous:
+        _blend_each(dst, sprites, ids, xs, ys)
+        return
+
+    groups = [] # (members, rows, cols, color, inv_alpha, opaque) per sprite, over its pixels with nonzero alpha
+    pad = 0
+    for sprite_id in np.unique(ids).tolist():
+        sprite = sprites[sprite_id]
+        if sprite is None:
+            continue
+        alpha = sprite.alpha[:, :, 0]
+        rows, cols = np.nonzero(alpha)
+        if len(rows):
+            pad = max(pad, *sprite.shape)
+            members = np.flatnonzero(ids == sprite_id).astype(np.int32)
+            groups.append((members, rows, cols, sprite.color[rows, cols], sprite.inv_alpha[rows, cols], alpha[rows, cols] == 255))
+    if not groups:
+        return
+
+    # Work on a canvas that spans every placement in full, so none needs clipping. Canvas pixels
+    # outside dst are marked as covered by a sprite above all others, which keeps them out of the output.
+    h, w = dst.shape[:2]
+    xs = np.asarray(xs, dtype=np.intp)
+    ys = np.asarray(ys, dtype=np.intp)
+    visible = (xs > -pad) & (xs < w) & (ys > -pad) & (ys < h) # Anything further out is off-screen
+    if not visible.any():
+        return
+    x0, y0 = int(xs[visible].min()), int(ys[visible].min())
+    cw = int(xs[visible].max()) + pad - x0
+    ch = int(ys[visible].max()) + pad - y0
+    groups = [(members[visible[members]], *footprint) for members, *footprint in groups]
+    if sum(len(members) * len(rows) for members, rows, *_ in groups) < MIN_OVERDRAW * cw * ch:
+        # Too little overlap to make up for the per-pixel bookkeeping below
+        _blend_each(dst, sprites, ids[visible], xs[visible], ys[visible])
+        return
+    top = np.full((ch, cw), n, dtype=np.int32)
+    top[max(-y0, 0):h - y0, max(-x0, 0):w - x0] = -1
+    top = top.ravel()
+    base = (ys - y0) * cw + xs - x0
+
+    # Index of the topmost sprite that is opaque at each pixel
+    for members, rows, cols, _, _, opaque in groups:
+        offsets = (rows * cw + cols)[opaque]
+        # Flat index and value arrays; broadcast ones send ufunc.at down a much slower path
+        np.maximum.at(top, (base[members, None] + offsets).ravel(), np.repeat(members, len(offsets)))
+
+    # Every (pixel, sprite) pair at or above that sprite
+    pixels, order, color, inv_alpha = [], [], [], []
+    for members, rows, cols, sprite_color, sprite_inv_alpha, _ in groups:
+        covered = (base[members, None] + (rows * cw + cols)).ravel()
+        live = np.flatnonzero(np.repeat(members, len(rows)) >= np.take(top, covered))
+        member, k = np.divmod(live, len(rows))
+        pixels.append(np.take(covered, live))
+        order.append(np.take(members, member))
+        color.append(np.take(sprite_color, k, axis=0))
+        inv_alpha.append(np.take(sprite_inv_alpha, k, axis=0))
+    pixels = np.concatenate(pixels)
+    order = np.concatenate(order)
+    color = np.concatenate(color)
+    inv_alpha = np.concatenate(inv_alpha)
+
+    # Pixels with a single pair left need no ordering and go in one pass; the others are
+    # sorted by pixel, then bottom to top, and counted into layers from the bottom of each stack
+    stacked = np.bincount(pixels, minlength=len(top))[pixels] > 1
+    single = np.flatnonzero(~stacked)
+    stacked = np.flatnonzero(stacked)
+    by_pixel = stacked[np.argsort(pixels[stacked] * n + order[stacked])]
+    sorted_pixels = pixels[by_pixel]
+    starts = np.flatnonzero(np.r_[True, sorted_pixels[1:] != sorted_pixels[:-1]])
+    layer = np.arange(len(by_pixel)) - np.repeat(starts, np.diff(np.r_[starts, len(by_pixel)]))
+    layer = layer.astype(np.min_scalar_type(n)) # Small ints, so the stable sort is a radix sort
+    by_layer = np.argsort(layer, kind="stable")
+    passes = np.split(by_pixel[by_layer], np.cumsum(np.bincount(layer))[:-1]) if len(layer) else []
+
+    flat = dst.reshape(-1, 3)
+    for pairs in [single] + passes:
+        row, col = np.divmod(pixels[pairs], cw)
+        p = (row + y0) * w + col + x0
+        out = np.multiply(np.take(flat, p, axis=0), inv_alpha[pairs], dtype=np.uint16)
+        _div255(out)
+        out += color[pairs]
+        flat[p] = out
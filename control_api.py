@@ -0,0 +1,200 @@
+import logging
+import math
+import socket
+import threading
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server, select_address_family
+
+from stage_timing import stage_timings
+
+
+class ControlError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _is_number(value):
+    # Python's JSON parser accepts Infinity and NaN, which no setting can hold
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _coerce(current, value, key):
+    """Converts a JSON ``value`` to the type of the attribute it replaces."""
+    if isinstance(current, bool):
+        if not isinstance(value, bool):
+            raise ControlError(f"{key} must be true or false")
+        return value
+    if not _is_number(value) or value < 0:
+        raise ControlError(f"{key} must be a non-negative number")
+    if key.endswith("duration") and value < 1:
+        raise ControlError(f"{key} must be at least 1 frame") # A zero-frame effect would never end its reaction
+    if isinstance(current, int):
+        if int(value) != value:
+            raise ControlError(f"{key} must be an integer")
+        return int(value)
+    return float(value)
+
+
+def _detector_state(detector):
+    return {
+        "name": detector.name,
+        "enabled": detector.enabled,
+        "priority": detector.priority,
+        "tunables": {key: getattr(detector, key) for key in detector.tunables},
+    }
+
+
+def _inference_state(reactions):
+    engine = reactions.inference
+    state = {
+        "rate_hz": reactions.inference_rate,
+        "face_interval": engine.face_interval,
+        "roi_tracking": engine.roi_tracking,
+        "redetect_interval": engine.redetect_interval,
+        "emojis_per_frame": reactions.emojis_per_frame,
+    }
+    if engine.motion_gate is not None:
+        state["motion_threshold"] = engine.motion_gate.threshold
+    return state
+
+
+def create_app(reactions, pipeline=None):
+    """Flask app exposing live metrics and runtime settings of ``reactions`` (and ``pipeline``).
+
+    Every handler only reads or assigns plain attributes, and changes that
+    need the frame thread (switching the inference rate) are queued for it,
+    so requests never block or race the frame loop.
+
+        GET  /metrics                fps, drops, stage latencies, particle counts
+        GET  /detectors              every detector's enabled flag and tunables
+        POST /detectors/<name>       {"enabled": false, "effect_duration": 30, ...}
+        GET  /inference              inference cadence settings
+        POST /inference              {"rate_hz": 15, "face_interval": 5, ...}
+    """
+    app = Flask(__name__)
+    manager = reactions.reaction_manager
+
+    @app.errorhandler(ControlError)
+    def control_error(e):
+        return jsonify(error=str(e)), e.status
+
+    def json_body():
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise ControlError("expected a JSON object")
+        return body
+
+    @app.get("/metrics")
+    def metrics():
+        fist_bump = manager.get("fist_bump")
+        active = manager.active_detector
+        return jsonify(
+            fps=round(pipeline.fps, 1) if pipeline is not None else None,
+            pipeline=pipeline.stats() if pipeline is not None else None,
+            stages=stage_timings.summary(),
+            particles=reactions.particles.count,
+            particles_dropped=reactions.particles.dropped,
+            smoke=fist_bump.smoke.count if fist_bump is not None else 0,
+            active_reaction=active.name if active is not None else None,
+            inference=reactions.inference.stats(),
+        )
+
+    @app.get("/detectors")
+    def detectors():
+        return jsonify([_detector_state(detector) for detector in manager.detectors])
+
+    @app.get("/detectors/<name>")
+    def detector(name):
+        detector = manager.get(name)
+        if detector is None:
+            raise ControlError(f"unknown detector: {name}", 404)
+        return jsonify(_detector_state(detector))
+
+    @app.post("/detectors/<name>")
+    def update_detector(name):
+        detector = manager.get(name)
+        if detector is None:
+            raise ControlError(f"unknown detector: {name}", 404)
+        body = json_body()
+        allowed = ("enabled",) + detector.tunables
+        unknown = [key for key in body if key not in allowed]
+        if unknown:
+            raise ControlError(f"not adjustable on {name}: {', '.join(unknown)}")
+        # Validate everything first, so a bad value doesn't leave a half-applied update
+        updates = {key: _coerce(getattr(detector, key), value, key) for key, value in body.items()}
+        for key, value in updates.items():
+            setattr(detector, key, value)
+        return jsonify(_detector_state(detector))
+
+    @app.get("/inference")
+    def inference():
+        return jsonify(_inference_state(reactions))
+
+    @app.post("/inference")
+    def update_inference():
+        body = json_body()
+        engine = reactions.inference
+        unknown = [key for key in body if key not in _inference_state(reactions)]
+        if unknown:
+            raise ControlError(f"not adjustable: {', '.join(unknown)}")
+        # Validate everything first, so a bad value doesn't leave a half-applied update
+        rate = body.get("rate_hz")
+        if rate is not None and (not _is_number(rate) or rate <= 0):
+            raise ControlError("rate_hz must be a positive number, or null to run inference inline")
+        for key in ("face_interval", "redetect_interval", "emojis_per_frame"):
+            if key in body and (not _is_number(body[key]) or int(body[key]) != body[key] or body[key] < 1):
+                raise ControlError(f"{key} must be a positive integer")
+        capacity = reactions.particles.capacity
+        if "emojis_per_frame" in body and body["emojis_per_frame"] > capacity:
+            raise ControlError(f"emojis_per_frame must be at most {capacity}, the particle capacity")
+        if "roi_tracking" in body and not isinstance(body["roi_tracking"], bool):
+            raise ControlError("roi_tracking must be true or false")
+        if "motion_threshold" in body and (not _is_number(body["motion_threshold"]) or body["motion_threshold"] < 0):
+            raise ControlError("motion_threshold must be a non-negative number")
+
+        if "rate_hz" in body:
+            reactions.set_inference_rate(rate) # Applied by the frame thread on its next frame
+        if "face_interval" in body:
+            engine.set_face_interval(int(body["face_interval"]))
+        if "redetect_interval" in body:
+            engine.redetect_interval = int(body["redetect_interval"])
+        if "emojis_per_frame" in body:
+            reactions.emojis_per_frame = int(body["emojis_per_frame"])
+        if "roi_tracking" in body:
+            engine.roi_tracking = body["roi_tracking"]
+        if "motion_threshold" in body:
+            engine.motion_gate.threshold = float(body["motion_threshold"])
+
+        state = _inference_state(reactions)
+        if "rate_hz" in body:
+            state["rate_hz"] = rate
+        return jsonify(state)
+
+    return app
+
+
+class ControlServer:
+    """Serves create_app() on localhost from a daemon thread, away from the frame loop.
+
+    The port is bound in __init__, which raises OSError if it is already in use.
+    """
+
+    def __init__(self, reactions, pipeline=None, host="127.0.0.1", port=5050):
+        self.host = host
+        self.port = port
+        # Bound here, as make_server() prints an error and exits the process when the port is taken
+        with socket.create_server((host, port), family=select_address_family(host, port)) as sock:
+            self._server = make_server(host, port, create_app(reactions, pipeline), threaded=True, fd=sock.fileno())
+        self._thread = threading.Thread(target=self._server.serve_forever, name="control-api", daemon=True)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING) # No log line per request
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._thread.join(timeout=2)
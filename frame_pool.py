@@ -0,0 +1,52 @@
+import threading
+
+import numpy as np
+
+
+class FramePool:
+    """Fixed set of preallocated, same-shaped frames recycled between pipeline stages.
+
+    Stages acquire() a frame to write into (a capture read, a ``dst=`` for
+    flip or color conversion) and release() it once the next stage is done
+    with it. The pool is sized for the frames in flight, so in steady state
+    no frame is ever allocated; ``allocations`` only grows if it runs dry.
+    """
+
+    def __init__(self, size=6):
+        self.size = size
+        self.shape = None # Set by the first configure(), usually from the first captured frame
+        self.allocations = 0
+        self._free = []
+        self._lock = threading.Lock()
+
+    def configure(self, shape):
+        """(Re)allocates the pool for frames of ``shape``, dropping frames of any other shape."""
+        with self._lock:
+            if shape == self.shape:
+                return
+            self.shape = shape
+            self._free = [np.empty(shape, dtype=np.uint8) for _ in range(self.size)]
+            self.allocations += self.size
+
+    def acquire(self):
+        """A free frame, or None while the pool hasn't been configured yet."""
+        with self._lock:
+            if self.shape is None:
+                return None
+            if self._free:
+                return self._free.pop()
+            self.allocations += 1
+            shape = self.shape
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, frame):
+        """Hands ``frame`` back. It must not be used by the caller afterwards."""
+        if frame is None:
+            return
+        with self._lock:
+            if frame.shape == self.shape and len(self._free) < self.size:
+                self._free.append(frame)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._free)
@@ -0,0 +1,126 @@
+import importlib
+import os
+import sys
+import traceback
+import types
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Detector and effect modules that can be reloaded inside the running process,
+# in dependency order: a module only imports modules listed before it.
+HOT_RELOAD_MODULES = [
+    "compositing",
+    "sprite_cache",
+    "transitions",
+    "particles",
+    "Detections.hand_features",
+    "Detections.gesture_classifier",
+    "perception",
+    "Detections.base_detector",
+    "Detections.thumbs_up_detector",
+    "Detections.peace_detector",
+    "Detections.heart_detector",
+    "Detections.blush_detector",
+    "Detections.fist_bump_detector",
+    "Detections.salute_detector",
+]
+
+
+def module_name(path):
+    """Dotted module name of a project source file, e.g. Detections/heart_detector.py -> Detections.heart_detector."""
+    relative = os.path.relpath(os.path.abspath(path), PROJECT_DIR)
+    return os.path.splitext(relative)[0].replace(os.sep, ".")
+
+
+def is_hot_reloadable(path):
+    return module_name(path) in HOT_RELOAD_MODULES
+
+
+def _mtime(module):
+    try:
+        return os.path.getmtime(module.__file__)
+    except (AttributeError, OSError):
+        return None
+
+
+class HotReloader:
+    """Reloads changed detector and effect modules and swaps fresh detectors into a running Reactions.
+
+    Changed modules are found by their file's modification time; every
+    listed module after the first changed one is reloaded too, since it may
+    hold on to names from it. Names that other project modules imported
+    from a reloaded module (``from particles import ParticleSystem``, or a
+    module-level instance such as ``from sprite_cache import sprite_cache``)
+    are rebound to the new objects. Inference graphs, the camera and the
+    pipeline live in modules that are never reloaded, so they stay warm.
+    """
+
+    def __init__(self):
+        self._mtimes = {name: _mtime(sys.modules[name]) for name in HOT_RELOAD_MODULES if name in sys.modules}
+
+    def changed_modules(self):
+        for index, name in enumerate(HOT_RELOAD_MODULES):
+            module = sys.modules.get(name)
+            if module is not None and _mtime(module) != self._mtimes.get(name):
+                return [name for name in HOT_RELOAD_MODULES[index:] if name in sys.modules]
+        return []
+
+    def reload(self, reactions):
+        """Reloads what changed and rebuilds the detectors. Returns the reloaded module names.
+
+        On an error (a syntax error in the saved file, say) the traceback is
+        printed and the previous detectors keep running.
+        """
+        names = self.changed_modules()
+        if not names:
+            return []
+        try:
+            old = {name: sys.modules[name] for name in names}
+            old_objects = {name: dict(vars(module)) for name, module in old.items()}
+            for name in names:
+                self._mtimes[name] = _mtime(sys.modules[name])
+                importlib.reload(sys.modules[name])
+            self._rebind(names, old_objects)
+
+            reactions_module = sys.modules[type(reactions).__module__]
+            reactions_module.DETECTORS = [self._current(cls) for cls in reactions_module.DETECTORS]
+            if "particles" in names:
+                reactions.particles = reactions_module.ParticleSystem()
+            if "Detections.gesture_classifier" in names and reactions.gesture_classifier is not None:
+                reactions.gesture_classifier = reactions_module.GestureClassifier()
+            reactions.replace_detectors(reactions_module.DETECTORS)
+        except Exception:
+            print("HotReloader: reload failed, keeping the previous detectors")
+            traceback.print_exc()
+            return []
+        print(f"HotReloader: reloaded {', '.join(names)}")
+        return names
+
+    @staticmethod
+    def _current(obj):
+        """The object of the same name in the current version of ``obj``'s module."""
+        return getattr(sys.modules[obj.__module__], obj.__name__)
+
+    def _rebind(self, names, old_objects):
+        """Points names other project modules imported from the reloaded modules at the new objects.
+
+        Classes, functions and instances of the module's own classes are
+        rebound; other values (numbers, strings, None) may be shared with
+        unrelated names, so they are left alone.
+        """
+        replaced = {}
+        for name in names:
+            module = sys.modules[name]
+            for attr, value in old_objects[name].items():
+                if attr not in vars(module):
+                    continue
+                if isinstance(value, (type, types.FunctionType)) or type(value).__module__ == name:
+                    replaced[id(value)] = vars(module)[attr]
+        for module in list(sys.modules.values()):
+            path = getattr(module, "__file__", None)
+            if not path or not os.path.abspath(path).startswith(PROJECT_DIR + os.sep) or module.__name__ in names:
+                continue
+            for attr, value in list(vars(module).items()):
+                new = replaced.get(id(value))
+                if new is not None:
+                    setattr(module, attr, new)
@@ -0,0 +1,295 @@
+import threading
+import time
+
+import mediapipe as mp
+import numpy as np
+
+from Detections.face_detector import FaceDetector
+from Detections.hand_features import landmarks_to_array
+from process_inference import ProcessInference
+from stage_timing import stage_timings
+from tracking import FaceTracker, hand_roi, map_hands_from_roi
+
+mp_hands = mp.solutions.hands
+
+
+def handedness_labels(hand_results):
+    """The "Left"/"Right" label of each hand in a MediaPipe hands result."""
+    return [handedness.classification[0].label for handedness in hand_results.multi_handedness or ()]
+
+
+class HandGraphs:
+    """The MediaPipe hands graph, plus a crop graph for ROI tracking.
+
+    detect() looks for hands in the crop ``box`` first, when given, and
+    falls back to the full frame as soon as the crop loses them. The crop
+    graph runs in static image mode: the crop follows the hands from frame
+    to frame, so tracking landmarks across crops would mix coordinates of
+    different windows. Shared by InferenceEngine and the process backend's
+    hands worker.
+    """
+
+    def __init__(self, hand_config):
+        self.hand_config = hand_config
+        self.hands = mp_hands.Hands(**hand_config)
+        self._roi_hands = None # Built on first use, as ROI tracking is off by default
+
+    def detect(self, rgb, box=None):
+        """(multi_hand_landmarks or None, handedness labels, whether the crop was used) for an RGB frame."""
+        if box is not None:
+            if self._roi_hands is None:
+                self._roi_hands = mp_hands.Hands(**{**self.hand_config, "static_image_mode": True})
+            x0, y0, x1, y1 = box
+            hand_results = self._roi_hands.process(np.ascontiguousarray(rgb[y0:y1, x0:x1]))
+            if hand_results.multi_hand_landmarks:
+                hands = map_hands_from_roi(hand_results.multi_hand_landmarks, box, rgb.shape)
+                return hands, handedness_labels(hand_results), True
+            # Tracking lost, re-detect on the full frame right away
+
+        hand_results = self.hands.process(rgb)
+        return hand_results.multi_hand_landmarks or None, handedness_labels(hand_results), False
+
+
+class InferenceResult:
+    """Hand and face inference output for one frame."""
+
+    def __init__(self, hands, landmarks, faces, timestamp, seq=0, handedness=None):
+        self.hands = hands # MediaPipe multi_hand_landmarks, or None
+        self.landmarks = landmarks # (n_hands, 21, 3) float32
+        self.handedness = handedness or [] # "Left"/"Right" per hand, as classified by MediaPipe
+        self.faces = faces # bbox/keypoint dicts in pixels, see FaceDetector.detect
+        self.timestamp = timestamp # time.monotonic() when the frame was captured
+        self.seq = seq
+
+
+class InferenceEngine:
+    """Owns the MediaPipe hands and face graphs and runs both on an RGB frame.
+
+    With ``roi_tracking`` the hands graph runs on a padded crop around the
+    previous frame's hands (and face) instead of the full frame, falling
+    back to a full-frame detection every ``redetect_interval`` frames or as
+    soon as the crop loses the hands. Crop landmarks are mapped back to
+    full-frame normalized coordinates, so consumers can't tell the difference.
+
+    An optional ``motion_gate`` (see motion_gate.MotionGate) skips hand
+    inference on static frames once no hands have been seen for a while.
+
+    With ``face_interval`` above 1, the face graph only runs every that many
+    frames and a FaceTracker carries the faces in between, re-detecting
+    early whenever the tracker loses confidence.
+
+    ``backend`` "inline" runs both graphs one after the other on the calling
+    thread. "process" runs each in its own worker process (see
+    process_inference.ProcessInference), so hands and faces are detected
+    at the same time; results then carry landmarks but no MediaPipe
+    ``hands`` objects, which only matters for landmark drawing.
+    """
+
+    BACKENDS = ("inline", "process")
+
+    def __init__(self, max_num_hands=2, hand_confidence=0.9, face_confidence=0.7,
+                 roi_tracking=False, redetect_interval=10, motion_gate=None, face_interval=1, backend="inline"):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown inference backend {backend!r}, expected one of {', '.join(self.BACKENDS)}")
+        self.backend = backend
+        self._hand_config = dict(static_image_mode=False, max_num_hands=max_num_hands, min_detection_confidence=hand_confidence)
+        if backend == "process":
+            self.workers = ProcessInference(self._hand_config, face_confidence)
+            self.hands = self.face_detector = None
+        else:
+            self.workers = None
+            self.hands = HandGraphs(self._hand_config)
+            self.face_detector = FaceDetector(min_detection_confidence=face_confidence)
+        self.roi_tracking = roi_tracking
+        self.redetect_interval = redetect_interval
+        self.motion_gate = motion_gate
+        self.face_tracker = FaceTracker(face_interval) if face_interval > 1 else None
+        self.full_detections = 0
+        self.roi_detections = 0
+        self._prev_landmarks = np.zeros((0, 21, 3), dtype=np.float32)
+        self._prev_faces = []
+        self._frames_since_full = 0
+
+    def run(self, rgb, timestamp=None, seq=0):
+        workers = self.workers
+        if workers is not None:
+            rgb = workers.put(rgb) # Both worker processes read the frame from shared memory
+        # Process for hands, unless the scene is static and empty
+        detect_hands = self.motion_gate is None or self.motion_gate.should_run(rgb)
+        hands, handedness = None, []
+        if detect_hands and workers is not None:
+            workers.submit_hands(self._roi_box(rgb.shape)) # Runs while the faces are processed below
+        elif detect_hands:
+            with stage_timings.stage("hands"):
+                hands, handedness = self._detect_hands(rgb)
+        landmarks = landmarks_to_array(hands)
+
+        # Process for faces
+        with stage_timings.stage("faces"):
+            faces = self._detect_faces(rgb)
+
+        if detect_hands and workers is not None:
+            with stage_timings.stage("hands"):
+                landmarks, handedness = self._gather_hands() # Landmarks only, no MediaPipe hands objects
+        if detect_hands and self.motion_gate is not None:
+            self.motion_gate.record_hands(len(landmarks))
+
+        self._prev_landmarks, self._prev_faces = landmarks, faces
+        return InferenceResult(hands, landmarks, faces,
+                               time.monotonic() if timestamp is None else timestamp, seq, handedness)
+
+    def input_buffer(self, shape):
+        """A buffer to write the next frame of ``shape`` into to spare run() a copy, or None if run() doesn't need one."""
+        return self.workers.next_slot(shape) if self.workers is not None else None
+
+    def warm_up(self, frame_shape):
+        """Runs every graph once on a blank frame, so the first real frame doesn't pay for their initialization.
+
+        With ``roi_tracking`` that includes the crop hands graph: the blank
+        crop finds no hands, so the full-frame graph runs right after it.
+        """
+        blank = np.zeros(frame_shape, dtype=np.uint8)
+        box = (0, 0, frame_shape[1], frame_shape[0]) if self.roi_tracking else None
+        if self.workers is not None:
+            self.workers.wait_ready()
+            self.workers.put(blank)
+            self.workers.submit_hands(box)
+            self.workers.detect_faces()
+            self.workers.hands_result()
+            return
+        self.hands.detect(blank, box)
+        self.face_detector.detect_rgb(blank)
+
+    def close(self):
+        if self.workers is not None:
+            self.workers.close()
+
+    def stats(self):
+        stats = {"backend": self.backend, "full_detections": self.full_detections, "roi_detections": self.roi_detections}
+        if self.motion_gate is not None:
+            stats["motion_gate"] = self.motion_gate.stats()
+        tracker = self.face_tracker
+        if tracker is not None:
+            stats["face_detections"] = tracker.detections
+            stats["faces_tracked"] = tracker.tracked
+        return stats
+
+    @property
+    def face_interval(self):
+        return self.face_tracker.detect_interval if self.face_tracker is not None else 1
+
+    def set_face_interval(self, interval):
+        """Changes the face detection cadence; safe to call while another thread runs inference."""
+        self.face_tracker = FaceTracker(interval) if interval > 1 else None
+
+    def _detect_faces(self, rgb):
+        tracker = self.face_tracker # Read once, set_face_interval() may swap it meanwhile
+        if tracker is None:
+            return self._run_face_graph(rgb)
+        faces = tracker.track(rgb)
+        if faces is None:
+            faces = self._run_face_graph(rgb)
+            tracker.reset(rgb, faces)
+        return faces
+
+    def _run_face_graph(self, rgb):
+        if self.workers is not None:
+            return self.workers.detect_faces() # The current frame, already in shared memory
+        return self.face_detector.detect_rgb(rgb)
+
+    def _roi_box(self, frame_shape):
+        """The crop to look for hands in first, or None for a full-frame detection."""
+        if self.roi_tracking and self._frames_since_full < self.redetect_interval:
+            return hand_roi(self._prev_landmarks, self._prev_faces, frame_shape)
+        return None
+
+    def _gather_hands(self):
+        """Landmarks and handedness from the hands worker, counted like _detect_hands counts its detections."""
+        result = self.workers.hands_result()
+        if result is None:
+            return landmarks_to_array(None), []
+        landmarks, handedness, used_roi = result
+        self._count_detection(used_roi)
+        return landmarks, handedness
+
+    def _detect_hands(self, rgb):
+        hands, handedness, used_roi = self.hands.detect(rgb, self._roi_box(rgb.shape))
+        self._count_detection(used_roi)
+        return hands, handedness
+
+    def _count_detection(self, used_roi):
+        if used_roi:
+            self._frames_since_full += 1
+            self.roi_detections += 1
+        else:
+            self._frames_since_full = 0
+            self.full_detections += 1
+
+
+class AsyncInference:
+    """Runs an InferenceEngine on its own thread at no more than ``rate_hz``.
+
+    The render loop submit()s every frame and reads latest() without ever
+    waiting for inference; frames submitted while the engine is busy are
+    skipped, and only the most recent one is picked up next.
+
+    Submitted frames are copied into one of two buffers owned by this
+    object, so callers can keep reusing their own frame buffers.
+    """
+
+    def __init__(self, engine, rate_hz=15):
+        self.engine = engine
+        self.rate_hz = rate_hz
+        self.runs = 0
+        self._pending = None
+        self._latest = None
+        self._seq = 0
+        self._buffers = [None, None]
+        self._busy = None # Index of the buffer the inference thread is reading
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name="inference", daemon=True)
+        self._thread.start()
+
+    def submit(self, rgb):
+        """Offers a copy of an RGB frame to the inference thread."""
+        with self._cond:
+            index = 1 if self._busy == 0 else 0
+            buffer = self._buffers[index]
+            if buffer is None or buffer.shape != rgb.shape:
+                buffer = self._buffers[index] = np.empty_like(rgb)
+            np.copyto(buffer, rgb)
+            self._seq += 1
+            self._pending = (index, time.monotonic(), self._seq)
+            self._cond.notify()
+
+    def latest(self):
+        """The most recent result, or None before the first inference finishes."""
+        return self._latest
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=2)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._stopped)
+                if self._stopped:
+                    return
+                index, timestamp, seq = self._pending
+                self._pending = None
+                self._busy = index
+
+            started = time.monotonic()
+            self._latest = self.engine.run(self._buffers[index], timestamp, seq)
+            self.runs += 1
+            with self._cond:
+                self._busy = None
+
+            # Hold the configured rate; the render loop keeps going meanwhile
+            remaining = 1.0 / self.rate_hz - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
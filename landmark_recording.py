@@ -0,0 +1,126 @@
+import os
+import struct
+
+import numpy as np
+
+from perception import Perception
+
+# File layout: a fixed header followed by one fixed-size RECORD_DTYPE record per
+# frame, so a recording can be memory-mapped and indexed like an array.
+MAGIC = b"RXLM"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHBBBx") # magic, version, width, height, max hands, max faces, face keypoints, pad
+MAX_HANDS = 2
+MAX_FACES = 2
+FACE_KEYPOINTS = 6 # MediaPipe's face detector always returns six keypoints
+
+HANDEDNESS_CODES = {"Left": 0, "Right": 1}
+HANDEDNESS_LABELS = {code: label for label, code in HANDEDNESS_CODES.items()}
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("num_hands", "u1"),
+    ("num_faces", "u1"),
+    ("handedness", "i1", (MAX_HANDS,)), # HANDEDNESS_CODES, -1 when unknown
+    ("landmarks", "<f4", (MAX_HANDS, 21, 3)),
+    ("face_bbox", "<i2", (MAX_FACES, 4)),
+    ("face_keypoints", "<i2", (MAX_FACES, FACE_KEYPOINTS, 2)),
+])
+
+
+class LandmarkRecorder:
+    """Appends the hands and faces of every frame's Perception to a compact binary recording.
+
+    Each frame takes one fixed-size record (about 580 bytes, 60 MB for an hour at
+    30 fps); hands and faces beyond MAX_HANDS and MAX_FACES are left out.
+    """
+
+    def __init__(self, path, frame_shape):
+        self.path = path
+        self.frames = 0
+        height, width = frame_shape[:2]
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, width, height, MAX_HANDS, MAX_FACES, FACE_KEYPOINTS))
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+
+    def write(self, perception, timestamp=0.0):
+        self._record[...] = 0
+        record = self._record[0]
+        record["timestamp"] = timestamp
+
+        landmarks = perception.landmarks[:MAX_HANDS]
+        record["num_hands"] = len(landmarks)
+        record["landmarks"][:len(landmarks)] = landmarks
+        record["handedness"] = -1
+        for i, label in enumerate(perception.handedness[:MAX_HANDS]):
+            record["handedness"][i] = HANDEDNESS_CODES.get(label, -1)
+
+        faces = perception.faces[:MAX_FACES]
+        record["num_faces"] = len(faces)
+        for i, face in enumerate(faces):
+            record["face_bbox"][i] = face["bbox"]
+            keypoints = face["keypoints"][:FACE_KEYPOINTS]
+            record["face_keypoints"][i, :len(keypoints)] = keypoints
+
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkReplay:
+    """Memory-mapped reader for LandmarkRecorder files, returning each frame as a Perception.
+
+    Perceptions carry the recorded landmarks, handedness and faces but no RGB
+    frame or MediaPipe objects, which is all the detectors and effects use,
+    so ``Reactions.process_frame(frame, replay[i])`` runs without a model.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a landmark recording")
+        magic, version, width, height, max_hands, max_faces, keypoints = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a landmark recording")
+        if (version, max_hands, max_faces, keypoints) != (VERSION, MAX_HANDS, MAX_FACES, FACE_KEYPOINTS):
+            raise ValueError(f"{path} uses an unsupported recording layout (version {version})")
+        self.frame_shape = (height, width, 3)
+        # A recording cut off mid-write ends in a partial record, which is ignored
+        frames = (os.path.getsize(path) - HEADER.size) // RECORD_DTYPE.itemsize
+        if frames == 0:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE) # Can't map an empty recording
+        else:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(frames,))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        record = self.records[index]
+        num_hands, num_faces = record["num_hands"], record["num_faces"]
+        handedness = [HANDEDNESS_LABELS.get(int(code)) for code in record["handedness"][:num_hands]]
+        faces = [
+            {"bbox": tuple(int(v) for v in record["face_bbox"][i]),
+             "keypoints": [(int(x), int(y)) for x, y in record["face_keypoints"][i]]}
+            for i in range(num_faces)
+        ]
+        landmarks = np.array(record["landmarks"][:num_hands]) # Copy out of the read-only map
+        return Perception(None, None, faces, self.frame_shape, landmarks, handedness)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def timestamp(self, index):
+        return float(self.records[index]["timestamp"])
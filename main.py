@@ -1,23 +1,122 @@
+import time
+STARTED_AT = time.monotonic() # Reference point for the time to first output frame
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import pyvirtualcam
+from pyvirtualcam import PixelFormat
 import os
+import signal
 os.environ['GLOG_minloglevel'] = '2'
+if hasattr(signal, 'SIGUSR1'):
+    # Ignore watch.py's hot reload signal until startup is done; the code being loaded is already current
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
 
-from reactions import Reactions
+# Hz for MediaPipe inference, e.g. 15 to halve inference CPU while effects still
+# render at the full output rate. None runs inference on every frame.
+INFERENCE_RATE = None
+# Run hand inference on a crop around the previous frame's hands, with a
+# periodic full-frame re-detect. Worth it at 720p/1080p capture.
+HAND_ROI_TRACKING = False
+# Drop hand inference to a slow poll while the scene is static and no hands are in view
+MOTION_GATING = True
+# Run face detection every N frames and track the face box in between
+FACE_DETECTION_INTERVAL = 5
+# File to record hand landmarks and faces to, for inference-free replay
+# (see landmark_recording.py and bench.py --replay). None disables recording.
+RECORD_LANDMARKS = None
+# Score every gesture in one pass with the template classifier (Detections/gesture_classifier.py)
+# instead of each detector's hand-written rules
+GESTURE_CLASSIFIER = False
+# Where the MediaPipe graphs run: "inline" runs hands then faces on the frame thread, "process"
+# runs them at the same time in two worker processes fed through shared memory
+INFERENCE_BACKEND = "inline"
+# Time every stage of the frame loop and print a p50/p95/p99/max summary every few seconds
+STAGE_TIMING = True
 
-cap = cv2.VideoCapture(0)
-reactions_handler = Reactions()
+# Port of the localhost control and metrics API (see control_api.py), None to disable it
+CONTROL_API_PORT = 5050
 
-with pyvirtualcam.Camera(width=640, height=480, fps=30) as cam:
-    print(f'Using virtual camera: {cam.device}')
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frame = cv2.flip(frame, 1)
-        # Pass the frame to the reactions handler for processing
-        reactions_handler.process_frame(frame)
+FRAME_SHAPE = (480, 640, 3) # Output resolution, as (height, width, channels)
 
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        cam.send(rgb_frame)
-        cam.sleep_until_next_frame()
+startup_times = {}
+
+
+def timed(name, fn, *args, **kwargs):
+    """Calls ``fn`` and records how long it took under ``name`` in startup_times."""
+    started = time.monotonic()
+    result = fn(*args, **kwargs)
+    startup_times[name] = time.monotonic() - started
+    return result
+
+
+def open_virtual_camera(width=640, height=480, fps=30):
+    """Opens the virtual camera in BGR, so processed frames need no conversion, falling back to RGB."""
+    try:
+        return pyvirtualcam.Camera(width=width, height=height, fps=fps, fmt=PixelFormat.BGR)
+    except RuntimeError as e:
+        print(f'Virtual camera does not accept BGR ({e}), falling back to RGB')
+        return pyvirtualcam.Camera(width=width, height=height, fps=fps, fmt=PixelFormat.RGB)
+
+
+# Guarded, as the "process" inference backend starts its workers with spawn, which imports this module again
+if __name__ == "__main__":
+    # Open the camera and the virtual camera in the background while mediapipe is
+    # imported and its graphs are built below; all of them take a while.
+    startup = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+    cap_future = startup.submit(timed, 'camera', cv2.VideoCapture, 0)
+    cam_future = startup.submit(timed, 'virtual camera', open_virtual_camera, FRAME_SHAPE[1], FRAME_SHAPE[0])
+
+    from reactions import Reactions
+    from pipeline import Pipeline
+    from control_api import ControlServer
+    from stage_timing import stage_timings
+
+    stage_timings.enabled = STAGE_TIMING
+    startup_times['imports'] = time.monotonic() - STARTED_AT
+
+    reactions_handler = timed('graphs', Reactions, inference_rate=INFERENCE_RATE, hand_roi_tracking=HAND_ROI_TRACKING,
+                              motion_gating=MOTION_GATING, face_interval=FACE_DETECTION_INTERVAL,
+                              record_landmarks=RECORD_LANDMARKS, gesture_classifier=GESTURE_CLASSIFIER,
+                              inference_backend=INFERENCE_BACKEND)
+    if hasattr(signal, 'SIGUSR1'):
+        # watch.py sends SIGUSR1 after detector or effect code was saved
+        signal.signal(signal.SIGUSR1, lambda signum, frame: reactions_handler.request_hot_reload())
+    # Decode effect assets in the background; effects still load them lazily if a reaction comes first
+    startup.submit(timed, 'assets', reactions_handler.preload, FRAME_SHAPE)
+    timed('warm-up', reactions_handler.inference.warm_up, FRAME_SHAPE)
+
+    cap = cap_future.result()
+    startup.shutdown(wait=False)
+    print('Startup: ' + ', '.join(f'{name} {seconds:.2f} s' for name, seconds in list(startup_times.items())))
+
+    with cam_future.result() as cam:
+        print(f'Using virtual camera: {cam.device} ({cam.fmt.name})')
+        pipeline = Pipeline(cap, reactions_handler, output_format="BGR" if cam.fmt == PixelFormat.BGR else "RGB",
+                            started_at=STARTED_AT)
+        print(f'Conversion path: {pipeline.conversion_path()}')
+        control_server = None
+        if CONTROL_API_PORT:
+            try:
+                control_server = ControlServer(reactions_handler, pipeline, port=CONTROL_API_PORT)
+            except OSError as e:
+                # Most likely the port is taken, e.g. by another instance; the camera works without the API
+                print(f'Control API disabled, cannot listen on port {CONTROL_API_PORT}: {e}')
+        if control_server is not None:
+            control_server.start()
+            print(f'Control API on http://{control_server.host}:{control_server.port}')
+        pipeline.start()
+        try:
+            pipeline.run_output(cam)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if control_server is not None:
+                control_server.stop()
+            pipeline.stop()
+            reactions_handler.close()
+            print(f'Pipeline stats: {pipeline.stats()}')
+            print(f'Inference stats: {reactions_handler.inference.stats()}')
+            if stage_timings.enabled:
+                print(f'Stage timings p50/p95/p99/max ms: {stage_timings.summary_line()}')
+
+    cap.release()
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap check in front of hand inference that idles it on static, hand-free scenes.
+
+    Each frame is shrunk to a small grayscale thumbnail and compared with the
+    previous one. Once no hands have been seen for ``idle_after`` frames and
+    the mean absolute difference stays below ``threshold``, hand inference
+    only runs every ``idle_poll_interval`` frames; any motion brings it back
+    to every frame immediately.
+    """
+
+    def __init__(self, threshold=3.0, idle_after=15, idle_poll_interval=15, size=(80, 60)):
+        self.threshold = threshold # Mean absolute pixel difference (0-255) that counts as motion
+        self.idle_after = idle_after
+        self.idle_poll_interval = idle_poll_interval
+        self.size = size
+        self.executed = 0
+        self.skipped = 0
+        self.motion_energy = 0.0
+        self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._prev_gray = None
+        self._frames_without_hands = 0
+        self._frames_since_run = 0
+
+    def should_run(self, rgb):
+        """Returns whether hand inference should run on this frame, and counts the decision."""
+        cv2.resize(rgb, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_RGB2GRAY, dst=self._gray)
+        if self._prev_gray is None:
+            self._prev_gray = np.empty_like(self._gray)
+            self.motion_energy = float("inf")
+        else:
+            self.motion_energy = float(cv2.absdiff(self._gray, self._prev_gray).mean())
+        self._gray, self._prev_gray = self._prev_gray, self._gray
+
+        idle = self._frames_without_hands >= self.idle_after and self.motion_energy < self.threshold
+        run = not idle or self._frames_since_run + 1 >= self.idle_poll_interval
+        if run:
+            self.executed += 1
+            self._frames_since_run = 0
+        else:
+            self.skipped += 1
+            self._frames_since_run += 1
+        return run
+
+    def record_hands(self, num_hands):
+        """Feeds back how many hands the last inference found."""
+        self._frames_without_hands = 0 if num_hands else self._frames_without_hands + 1
+
+    def stats(self):
+        return {"executed": self.executed, "skipped": self.skipped, "motion_energy": self.motion_energy}
@@ -0,0 +1,187 @@
+import cv2
+import numpy as np
+
+from compositing import blend_color, blend_many
+from sprite_cache import sprite_cache
+
+
+class ParticleSystem:
+    """Fixed-capacity struct-of-arrays store for emoji particles.
+
+    Positions, velocities, scales and sprite ids live in parallel NumPy
+    arrays; only the first ``count`` slots are alive. Integration, culling
+    and drawing run as whole-array operations, so the per-frame Python work
+    doesn't grow with the number of particles.
+    """
+
+    def __init__(self, capacity=1024, gravity=0.5, margin=50):
+        self.capacity = capacity
+        self.gravity = gravity
+        self.margin = margin # Particles are culled once they are this far above or below the frame
+        self.count = 0
+        self.dropped = 0 # Spawns rejected because the store was full
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.scale = np.zeros(capacity, dtype=np.float32)
+        self.sprite_id = np.zeros(capacity, dtype=np.int32)
+        self._sprites = [] # sprite id -> shared sprite from the sprite cache
+        self._sprite_ids = {} # (image_path, scale bucket) -> sprite id
+
+    def sprite_id_for(self, image_path, scale):
+        """Returns the sprite id for ``image_path`` at ``scale``, loading the sprite on first use."""
+        key = (image_path, sprite_cache.quantize(scale))
+        sprite_id = self._sprite_ids.get(key)
+        if sprite_id is None:
+            sprite_id = len(self._sprites)
+            self._sprites.append(sprite_cache.get(image_path, scale))
+            self._sprite_ids[key] = sprite_id
+        return sprite_id
+
+    def spawn(self, x, y, vx, vy, scale, image_path):
+        """Adds a batch of particles. Every argument but ``image_path`` may be a scalar or an array."""
+        x, y, vx, vy, scale = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(v, dtype=np.float32)) for v in (x, y, vx, vy, scale))
+        )
+        n = min(len(x), self.capacity - self.count)
+        self.dropped += len(x) - n
+        if n <= 0:
+            return
+
+        buckets = np.maximum(1, np.rint(scale[:n] / sprite_cache.scale_step)).astype(np.int32)
+        ids = np.empty(n, dtype=np.int32)
+        for bucket in np.unique(buckets):
+            ids[buckets == bucket] = self.sprite_id_for(image_path, bucket * sprite_cache.scale_step)
+
+        s = slice(self.count, self.count + n)
+        self.x[s] = x[:n]
+        self.y[s] = y[:n]
+        self.vx[s] = vx[:n]
+        self.vy[s] = vy[:n]
+        self.scale[s] = scale[:n]
+        self.sprite_id[s] = ids
+        self.count += n
+
+    def update(self):
+        n = self.count
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] += self.gravity
+
+    def cull(self, frame_height):
+        """Drops particles that left the frame vertically, compacting the survivors to the front."""
+        n = self.count
+        y = self.y[:n]
+        keep = np.flatnonzero((y > -self.margin) & (y < frame_height + self.margin))
+        if len(keep) == n:
+            return
+        m = len(keep)
+        for arr in (self.x, self.y, self.vx, self.vy, self.scale, self.sprite_id):
+            arr[:m] = arr[keep]
+        self.count = m
+
+    def draw(self, frame):
+        """Composites every live particle in one blend_many() call, older particles first."""
+        n = self.count
+        blend_many(frame, self._sprites, self.sprite_id[:n], self.x[:n].astype(np.int32), self.y[:n].astype(np.int32))
+
+    def step(self, frame):
+        """Advances every particle one frame, draws it and culls the ones that left the frame."""
+        self.update()
+        self.draw(frame)
+        self.cull(frame.shape[0])
+
+    def clear(self):
+        self.count = 0
+
+
+
+class SmokeSystem:
+    """Array-backed smoke puffs rendered through one alpha layer per frame.
+
+    All live particles are rasterized into a single uint8 alpha layer that
+    only covers their bounding box, and that layer is composited once, so
+    the cost follows the particle count rather than the frame size.
+    """
+
+    def __init__(self, capacity=256, color=(150, 150, 150)):
+        self.capacity = capacity
+        self.color = color # Grey
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.alpha = np.zeros(capacity, dtype=np.float32)
+        self.decay = np.zeros(capacity, dtype=np.float32) # How fast alpha decreases
+        self.size = np.zeros(capacity, dtype=np.float32) # Radius in pixels
+        self._layer = np.zeros((0, 0), dtype=np.uint8)
+
+    def spawn(self, x, y, count):
+        n = min(count, self.capacity - self.count)
+        if n <= 0:
+            return
+        s = slice(self.count, self.count + n)
+        self.x[s] = x
+        self.y[s] = y
+        self.vx[s] = np.random.uniform(-5, 5, n)
+        self.vy[s] = np.random.uniform(-5, 5, n)
+        self.alpha[s] = 255 # Start fully opaque
+        self.decay[s] = np.random.uniform(2, 10, n)
+        self.size[s] = np.random.uniform(4, 7, n)
+        self.count += n
+
+    def update(self):
+        n = self.count
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.alpha[:n] -= self.decay[:n]
+        np.maximum(self.alpha[:n], 0, out=self.alpha[:n])
+
+    def cull(self, frame_width, frame_height):
+        """Keeps particles that are still inside the frame and not fully faded."""
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        keep = np.flatnonzero((x > 0) & (x < frame_width) & (y > 0) & (y < frame_height) & (self.alpha[:n] > 0))
+        if len(keep) == n:
+            return
+        m = len(keep)
+        for arr in (self.x, self.y, self.vx, self.vy, self.alpha, self.decay, self.size):
+            arr[:m] = arr[keep]
+        self.count = m
+
+    def draw(self, frame):
+        n = self.count
+        if n == 0:
+            return
+        xs = self.x[:n].astype(np.int32)
+        ys = self.y[:n].astype(np.int32)
+        radii = self.size[:n].astype(np.int32)
+        x0 = max(int((xs - radii).min()), 0)
+        y0 = max(int((ys - radii).min()), 0)
+        x1 = min(int((xs + radii).max()) + 1, frame.shape[1])
+        y1 = min(int((ys + radii).max()) + 1, frame.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        layer = self._layer_view(y1 - y0, x1 - x0)
+        # Faintest first, so overlapping puffs keep the strongest alpha
+        for i in np.argsort(self.alpha[:n]).tolist():
+            cv2.circle(layer, (int(xs[i]) - x0, int(ys[i]) - y0), int(radii[i]), int(self.alpha[i]), -1)
+        blend_color(frame, layer, self.color, x0, y0)
+
+    def _layer_view(self, h, w):
+        if self._layer.shape[0] < h or self._layer.shape[1] < w:
+            self._layer = np.zeros((max(h, self._layer.shape[0]), max(w, self._layer.shape[1])), dtype=np.uint8)
+        layer = self._layer[:h, :w]
+        layer.fill(0)
+        return layer
+
+    def step(self, frame):
+        self.update()
+        self.draw(frame)
+        self.cull(frame.shape[1], frame.shape[0])
+
+    def clear(self):
+        self.count = 0
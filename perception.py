@@ -0,0 +1,35 @@
+from Detections.hand_features import HandFeatures, landmarks_to_array
+
+
+class Perception:
+    """Everything the detectors and effects know about one frame, computed once per frame.
+
+    ``landmarks`` is an (n_hands, 21, 3) float32 array of normalized hand
+    landmarks and ``features`` the ``HandFeatures`` computed from it; the
+    detectors only read these. ``hands`` keeps MediaPipe's
+    ``multi_hand_landmarks`` (or None) for drawing. ``faces`` is a list of
+    ``{"bbox": (x, y, w, h), "keypoints": [(x, y), ...]}`` dicts in pixel
+    coordinates, as returned by ``FaceDetector.detect``. ``handedness``
+    holds MediaPipe's "Left"/"Right" label per hand, when known.
+    ``gesture_scores`` holds GestureClassifier.scores() for the frame when
+    the classifier is enabled, else None.
+    """
+
+    def __init__(self, rgb, hands, faces, frame_shape, landmarks=None, handedness=None):
+        self.rgb = rgb
+        self.hands = hands
+        self.handedness = handedness or []
+        self.faces = faces
+        self.height, self.width = frame_shape[:2]
+        self.landmarks = landmarks_to_array(hands) if landmarks is None else landmarks
+        self.features = HandFeatures(self.landmarks, self.width / self.height)
+        self.gesture_scores = None
+
+    @property
+    def num_hands(self):
+        return len(self.landmarks)
+
+    @property
+    def face(self):
+        """The first detected face, or None."""
+        return self.faces[0] if self.faces else None
@@ -0,0 +1,205 @@
+import threading
+import time
+import traceback
+from collections import deque
+
+import cv2
+
+from frame_pool import FramePool
+from stage_timing import stage_timings
+
+
+class FrameQueue:
+    """Bounded queue that drops its oldest item when full, so consumers always get the freshest frames."""
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self.maxsize = maxsize
+        self.on_drop = on_drop # Called with each dropped item, e.g. to recycle its buffer
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(dropped)
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Waits for an item. Returns None on timeout or once the queue is closed and drained."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self.closed, timeout)
+            return self._items.popleft() if self._items else None
+
+    def get_nowait(self):
+        with self._cond:
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        """Wakes up consumers; get() returns None once the remaining items are drained."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class Pipeline:
+    """Capture, reactions and virtual-camera output running as separate stages.
+
+    The capture thread only ever hands over the latest camera frame, the
+    processing thread runs ``Reactions.process_frame`` on it and the output
+    stage, run on the caller's thread, sends at the virtual camera's pace and
+    repeats the previous frame when processing falls behind. Stages are
+    connected by drop-oldest ``FrameQueue``s whose ``dropped`` counters say
+    where frames are lost.
+
+    Every frame buffer comes from a shared FramePool: the camera reads into
+    a pooled frame, flip and color conversion write into pooled ``dst=``
+    frames, and each frame goes back to the pool as soon as the next stage
+    is done with it (or a queue drops it), so the steady-state loop doesn't
+    allocate frames.
+
+    ``output_format`` is the pixel format the virtual camera was opened
+    with. With "BGR" the processed frame is sent as is, leaving the single
+    RGB conversion for inference as the only one per frame; "RGB" costs a
+    second conversion on the way out.
+    """
+
+    def __init__(self, cap, reactions, queue_size=1, output_format="RGB", started_at=None):
+        if output_format not in ("BGR", "RGB"):
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.cap = cap
+        self.reactions = reactions
+        self.output_format = output_format
+        self.started_at = started_at # time.monotonic() at process start, for time_to_first_frame
+        self.time_to_first_frame = None
+        # Frames in flight: one per queue slot, plus the capture read, the flip, the
+        # color conversion and the frame the output stage keeps for repeats
+        self.pool = FramePool(2 * queue_size + 4)
+        self.capture_queue = FrameQueue(queue_size, self.pool.release) # capture -> processing
+        self.output_queue = FrameQueue(queue_size, self.pool.release) # processing -> output
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.frames_sent = 0
+        self.frames_repeated = 0 # Output ticks that resent the previous frame
+        self.fps = 0.0 # Processed frames per second, over the last second or so
+        self._fps_frames = 0
+        self._fps_since = time.monotonic()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._process_loop, name="process", daemon=True),
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.capture_queue.close()
+        self.output_queue.close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            buffer = self.pool.acquire()
+            with stage_timings.stage("capture"):
+                ret, frame = self.cap.read(buffer)
+            if not ret:
+                self.pool.release(buffer)
+                break
+            if frame is not buffer:
+                # First frame, or the camera changed resolution: size the pool after it
+                self.pool.configure(frame.shape)
+            self.frames_captured += 1
+            self.capture_queue.put(frame)
+        self.capture_queue.close()
+
+    def _process_loop(self):
+        try:
+            while not self._stop.is_set():
+                frame = self.capture_queue.get()
+                if frame is None:
+                    break
+                with stage_timings.stage("flip"):
+                    flipped = cv2.flip(frame, 1, dst=self.pool.acquire())
+                self.pool.release(frame)
+                # Pass the frame to the reactions handler for processing
+                with stage_timings.stage("process_frame"):
+                    self.reactions.process_frame(flipped)
+                if self.output_format == "RGB":
+                    with stage_timings.stage("output_convert"):
+                        output = cv2.cvtColor(flipped, cv2.COLOR_BGR2RGB, dst=self.pool.acquire())
+                    self.pool.release(flipped)
+                else:
+                    output = flipped
+                self.output_queue.put(output)
+                self.frames_processed += 1
+                self._count_fps()
+                stage_timings.maybe_report()
+        except Exception:
+            print("Pipeline: processing failed, stopping")
+            traceback.print_exc()
+        finally:
+            # Always let run_output() finish, rather than it sending the last frame forever
+            self._stop.set()
+            self.output_queue.close()
+
+    def _count_fps(self):
+        self._fps_frames += 1
+        now = time.monotonic()
+        if now - self._fps_since >= 1.0:
+            self.fps = self._fps_frames / (now - self._fps_since)
+            self._fps_frames = 0
+            self._fps_since = now
+
+    def run_output(self, cam):
+        """Sends frames to ``cam`` at its frame rate until the capture ends or stop() is called."""
+        last_frame = self.output_queue.get() # Wait for the first frame
+        while last_frame is not None and not self._stop.is_set():
+            with stage_timings.stage("send"):
+                cam.send(last_frame)
+            if self.frames_sent == 0 and self.started_at is not None:
+                self.time_to_first_frame = time.monotonic() - self.started_at
+                print(f"Time to first output frame: {self.time_to_first_frame:.2f} s")
+            self.frames_sent += 1
+            cam.sleep_until_next_frame()
+
+            frame = self.output_queue.get_nowait()
+            if frame is None:
+                if self.output_queue.closed:
+                    break
+                self.frames_repeated += 1
+            else:
+                # cam.send() has copied the previous frame out, so it can be reused
+                self.pool.release(last_frame)
+                last_frame = frame
+
+    def conversion_path(self):
+        """Human readable description of the color conversions every frame goes through."""
+        output = "sent as BGR" if self.output_format == "BGR" else "converted BGR->RGB for output"
+        conversions = "1 conversion" if self.output_format == "BGR" else "2 conversions"
+        return f"camera BGR -> one BGR->RGB copy shared by all inference -> {output} ({conversions} per frame)"
+
+    def stats(self):
+        return {
+            "fps": round(self.fps, 1),
+            "captured": self.frames_captured,
+            "processed": self.frames_processed,
+            "sent": self.frames_sent,
+            "repeated": self.frames_repeated,
+            "dropped_before_processing": self.capture_queue.dropped,
+            "dropped_before_output": self.output_queue.dropped,
+            "frame_allocations": self.pool.allocations,
+            "time_to_first_frame": self.time_to_first_frame,
+        }
@@ -0,0 +1,222 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+RESULT_TIMEOUT = 2.0 # Seconds to wait for a worker before giving up on a frame
+STARTUP_TIMEOUT = 60.0 # Seconds a worker may take to import MediaPipe and build its graph
+
+
+class SharedFrameRing:
+    """Fixed-size ring of RGB frames in one shared memory block, visible to every worker process.
+
+    Frames are addressed by slot index, so a job message only needs the
+    slot and never the pixels themselves.
+    """
+
+    def __init__(self, shape, slots=4, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = slots * int(np.prod(self.shape))
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.frames = None # Drop the view before closing the mapping under it
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class _HandsJob:
+    """Runs inference.HandGraphs in a worker and replies with landmark arrays, which pickle cheaply."""
+
+    def __init__(self, hand_config):
+        from inference import HandGraphs
+        self.graphs = HandGraphs(hand_config)
+
+    def __call__(self, frame, box):
+        from Detections.hand_features import landmarks_to_array
+        hands, handedness, used_roi = self.graphs.detect(frame, box)
+        return landmarks_to_array(hands), handedness, used_roi
+
+
+class _FacesJob:
+    def __init__(self, face_confidence):
+        from Detections.face_detector import FaceDetector
+        self.detector = FaceDetector(min_detection_confidence=face_confidence)
+
+    def __call__(self, frame):
+        return self.detector.detect_rgb(frame)
+
+
+def _serve(conn, job):
+    """Worker loop: ("ring", name, shape, slots) attaches a frame ring, (seq, slot, *args) runs the job, None stops.
+
+    Sends "ready" first, as ``job`` and its graph are built by then.
+    """
+    ring = None
+    try:
+        conn.send("ready")
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            if message[0] == "ring":
+                if ring is not None:
+                    ring.close()
+                ring = SharedFrameRing(message[2], message[3], name=message[1])
+                continue
+            seq, slot, *args = message
+            conn.send((seq, job(ring.frames[slot], *args)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if ring is not None:
+            ring.close()
+
+
+def hands_worker(conn, hand_config):
+    _serve(conn, _HandsJob(hand_config))
+
+
+def faces_worker(conn, face_confidence):
+    _serve(conn, _FacesJob(face_confidence))
+
+
+class _Worker:
+    def __init__(self, context, name, target, *args):
+        self.name = name
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=target, args=(child_conn,) + args, name=name, daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def send(self, message):
+        self.conn.send(message)
+
+    def wait_ready(self, timeout=STARTUP_TIMEOUT):
+        """Blocks until the worker has built its graph; raises RuntimeError if it died or took longer than ``timeout``."""
+        if self.ready:
+            return
+        deadline = time.monotonic() + timeout
+        while not self.conn.poll(0.1):
+            if not self.process.is_alive():
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{self.name} not ready after {timeout:.0f} s")
+        try:
+            message = self.conn.recv()
+        except EOFError:
+            message = None
+        if message != "ready":
+            self.process.join(timeout=1) # Its pipe closes just before it is reaped
+            raise RuntimeError(f"{self.name} exited with code {self.process.exitcode} while starting")
+        self.ready = True
+
+    def result(self, seq, timeout=RESULT_TIMEOUT):
+        """The reply for frame ``seq``; replies to older frames that timed out are discarded. None on timeout.
+
+        The timeout only starts once the worker is ready, see wait_ready().
+        """
+        self.wait_ready()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.conn.poll(remaining):
+                if not self.process.is_alive():
+                    raise RuntimeError(f"{self.name} exited with code {self.process.exitcode}")
+                print(f"ProcessInference: {self.name} took longer than {timeout:.1f} s, skipping frame {seq}")
+                return None
+            reply_seq, result = self.conn.recv()
+            if reply_seq == seq:
+                return result
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class ProcessInference:
+    """The hands graph and the face graph, each in its own worker process.
+
+    put() places a frame in a SharedFrameRing (a no-op for a frame that was
+    converted straight into next_slot()), and both workers read it from
+    there, so no frame is ever pickled or piped. Jobs and replies carry the
+    frame's sequence number; a reply that arrives after its frame timed out
+    is recognized and dropped. As the two graphs run at the same time, a
+    frame costs about the slower of them instead of their sum.
+
+    Workers are started with "spawn", as forking a process that runs
+    MediaPipe and camera threads is unsafe; the entry script must therefore
+    guard its top-level code with ``if __name__ == "__main__":``.
+    """
+
+    def __init__(self, hand_config, face_confidence, slots=4):
+        self.slots = slots
+        self.ring = None
+        self._seq = 0
+        context = mp.get_context("spawn")
+        self.hands = _Worker(context, "hands worker", hands_worker, hand_config)
+        self.faces = _Worker(context, "faces worker", faces_worker, face_confidence)
+
+    def wait_ready(self):
+        """Blocks until both workers have built their graphs; they start in parallel from __init__."""
+        self.hands.wait_ready()
+        self.faces.wait_ready()
+
+    def next_slot(self, shape):
+        """The ring buffer the next put() will use, for callers to convert a frame straight into."""
+        if self.ring is None or self.ring.shape != tuple(shape):
+            self._attach(shape)
+        return self.ring.frames[(self._seq + 1) % self.slots]
+
+    def put(self, rgb):
+        """Makes ``rgb`` the current frame of both workers and returns its shared view."""
+        slot = self.next_slot(rgb.shape)
+        if not np.may_share_memory(slot, rgb):
+            np.copyto(slot, rgb)
+        self._seq += 1
+        return slot
+
+    def submit_hands(self, box=None):
+        """Starts hand detection on the current frame, on the crop ``box`` first when given."""
+        self.hands.send((self._seq, self._seq % self.slots, box))
+
+    def hands_result(self):
+        """(landmarks, handedness, used_roi) of the current frame, or None if the worker timed out."""
+        return self.hands.result(self._seq)
+
+    def detect_faces(self):
+        """Face dicts of the current frame, as FaceDetector.detect returns them; waits for the worker."""
+        self.faces.send((self._seq, self._seq % self.slots))
+        faces = self.faces.result(self._seq)
+        return faces if faces is not None else []
+
+    def close(self):
+        self.hands.stop()
+        self.faces.stop()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def _attach(self, shape):
+        old = self.ring
+        self.ring = SharedFrameRing(shape, self.slots)
+        for worker in (self.hands, self.faces):
+            worker.send(("ring", self.ring.name, self.ring.shape, self.slots))
+        if old is not None:
+            old.close() # Workers keep their own mapping of it until they switch over, so unlinking is safe
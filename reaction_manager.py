@@ -1,6 +1,38 @@
+from stage_timing import stage_timings
+
+
 class ReactionManager:
+    """Registry of detectors and arbiter of the reaction currently on screen.
+
+    Each frame only the enabled detectors whose declared preconditions hold
+    (hand count, face, cooldown) get to run detect(), in priority order,
+    and the first one that starts a reaction stops the rest. Effects are
+    applied for every registered detector, as they manage their own duration.
+    """
+
     def __init__(self):
         self._is_reaction_active = False
+        self.active_detector = None
+        self.detectors = []
+        self.frame_index = 0
+        self._ready_at = {} # detector name -> first frame it may detect again after its cooldown
+
+    def register(self, detector):
+        """Adds a detector, keeping the list ordered by priority (registration order breaks ties)."""
+        self.detectors.append(detector)
+        self.detectors.sort(key=lambda d: -d.priority)
+        return detector
+
+    def clear(self):
+        """Unregisters every detector and ends the current reaction; cooldowns carry over by name."""
+        self.detectors = []
+        self.set_reaction_active(False)
+
+    def get(self, name):
+        for detector in self.detectors:
+            if detector.name == name:
+                return detector
+        return None
 
     def is_reaction_active(self):
         """Checks if any reaction effect is currently active."""
@@ -8,4 +40,41 @@ class ReactionManager:
 
     def set_reaction_active(self, active):
         """Sets the state of whether a reaction is active."""
-        self._is_reaction_active = active
\ No newline at end of file
+        self._is_reaction_active = active
+        if not active:
+            self.active_detector = None
+
+    def start_reaction(self, detector):
+        """Called by a detector when its gesture fires; it owns the screen until end_reaction()."""
+        self.active_detector = detector
+        self._is_reaction_active = True
+
+    def end_reaction(self, detector):
+        """Called by a detector when its effect finishes. Starts that detector's cooldown."""
+        if self.active_detector is not None and self.active_detector is not detector:
+            return
+        self._ready_at[detector.name] = self.frame_index + detector.cooldown
+        self.set_reaction_active(False)
+
+    def eligible_detectors(self, perception):
+        return [
+            detector for detector in self.detectors
+            if detector.enabled
+            and self.frame_index >= self._ready_at.get(detector.name, 0)
+            and detector.is_eligible(perception)
+        ]
+
+    def process(self, perception, frame):
+        """Runs the eligible detectors, then every detector's effect."""
+        if not self._is_reaction_active:
+            for detector in self.eligible_detectors(perception):
+                with stage_timings.stage(detector.detect_stage):
+                    detector.detect(perception, frame)
+                if self._is_reaction_active:
+                    break
+
+        for detector in self.detectors:
+            with stage_timings.stage(detector.effect_stage):
+                detector.apply_effect(frame, perception)
+
+        self.frame_index += 1
@@ -1,46 +1,17 @@
+import time
 import cv2
 import mediapipe as mp
-import random
+import numpy as np
+from Detections.gesture_classifier import GestureClassifier
+from hot_reload import HotReloader
+from inference import AsyncInference, InferenceEngine
+from landmark_recording import LandmarkRecorder
+from motion_gate import MotionGate
+from particles import ParticleSystem
+from perception import Perception
+from tracking import LandmarkExtrapolator
 
 mp_hands = mp.solutions.hands
-mp_face_detection = mp.solutions.face_detection
-
-class Emoji:
-    def __init__(self, x, y, vx, vy, scale, image_path):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.scale = scale
-        self.image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-        if self.image is not None:
-            self.image = cv2.resize(self.image, (int(50 * scale), int(50 * scale)))
-
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.5  # gravity
-
-    def draw(self, frame):
-        if self.image is None:
-            return
-        h, w = self.image.shape[:2]
-        x1 = int(self.x)
-        y1 = int(self.y)
-        x2 = x1 + w
-        y2 = y1 + h
-
-        if x1 < 0 or y1 < 0 or x2 > frame.shape[1] or y2 > frame.shape[0]:
-            return
-
-        overlay = self.image[:, :, :3]
-        mask = self.image[:, :, 3:] / 255.0
-
-        roi = frame[y1:y2, x1:x2]
-        for c in range(3):
-            roi[:, :, c] = (1 - mask[:, :, 0]) * roi[:, :, c] + mask[:, :, 0] * overlay[:, :, c]
-        frame[y1:y2, x1:x2] = roi
-
 
 from Detections.thumbs_up_detector import ThumbsUpDetector
 from Detections.peace_detector import PeaceDetector
@@ -49,34 +20,128 @@ from Detections.blush_detector import BlushDetector
 from Detections.fist_bump_detector import FistBumpDetector
 from Detections.salute_detector import SaluteDetector # Import the new detector
 from reaction_manager import ReactionManager # Import the new class
+from sprite_cache import sprite_cache
+from stage_timing import stage_timings
 mp_drawing = None
 # mp_drawing = mp.solutions.drawing_utils
 
-class Reactions:
-    def __init__(self):
-        # Initialize MediaPipe Hands and Face Detection
-        self.hands = mp_hands.Hands(static_image_mode=False, max_num_hands=2, min_detection_confidence=0.9)
-        self.face_detection = mp_face_detection.FaceDetection(min_detection_confidence=0.7)
-        self.active_emojis = []
-        self.reaction_manager = ReactionManager() # Instantiate ReactionManager
-        self.thumbs_up_detector = ThumbsUpDetector(self, self.reaction_manager) # Pass manager
-        self.peace_detector = PeaceDetector(self, self.reaction_manager) # Pass manager
-        self.heart_detector = HeartDetector(self, self.reaction_manager) # Pass manager
-        self.blush_detector = BlushDetector(self, self.reaction_manager) # Pass manager
-        self.fist_bump_detector = FistBumpDetector(self, self.reaction_manager) # Pass manager
-        self.salute_detector = SaluteDetector(self, self.reaction_manager) # Instantiate the new detector
-
+FOUNTAIN_SCALE_RANGE = (0.4, 0.6) # Random emoji scale range of the fountain
 
-    def process_frame(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+# Registered in this order, which breaks ties between detectors of equal priority
+DETECTORS = [ThumbsUpDetector, PeaceDetector, HeartDetector, BlushDetector, FistBumpDetector, SaluteDetector]
 
-        # Process for hands
-        hand_results = self.hands.process(rgb)
-        hands = hand_results.multi_hand_landmarks if hand_results.multi_hand_landmarks else None
-
-        # Process for faces
-        face_results = self.face_detection.process(rgb)
-        faces = face_results.detections if face_results.detections else None
+class Reactions:
+    def __init__(self, inference_rate=None, hand_roi_tracking=False, motion_gating=False, face_interval=1,
+                 record_landmarks=None, gesture_classifier=False, inference_backend="inline"):
+        # Initialize MediaPipe Hands and Face Detection, shared by every detector. The "process"
+        # backend runs them in two worker processes at the same time instead of one after the other.
+        self.inference = InferenceEngine(roi_tracking=hand_roi_tracking,
+                                         motion_gate=MotionGate() if motion_gating else None,
+                                         face_interval=face_interval, backend=inference_backend)
+        # With an inference rate (Hz), MediaPipe runs on its own thread at that rate while
+        # effects keep rendering every frame on extrapolated landmarks. None runs it inline.
+        self.async_inference = AsyncInference(self.inference, inference_rate) if inference_rate else None
+        self.extrapolator = LandmarkExtrapolator()
+        # Scores every gesture in one pass for the detectors; without it each detector runs its own rules
+        self.gesture_classifier = GestureClassifier() if gesture_classifier else None
+        self._last_inference_seq = 0
+        self._requested_inference_rate = None # (rate,) waiting to be applied on the frame thread
+        self._rgb = None # Reused RGB conversion of the current frame
+        # Path to record every frame's landmarks and faces to, for replay with LandmarkReplay
+        self.record_landmarks = record_landmarks
+        self.recorder = None
+        self.particles = ParticleSystem()
+        self.emojis_per_frame = 1 # Particles spawned per frame by the fountain and heart spray
+        self.reaction_manager = ReactionManager() # Instantiate ReactionManager
+        for detector_class in DETECTORS:
+            self.reaction_manager.register(detector_class(self, self.reaction_manager))
+        self.hot_reloader = HotReloader()
+        self._reload_requested = False
+
+    def request_hot_reload(self):
+        """Reloads changed detector and effect modules before the next frame. Safe to call from any thread."""
+        self._reload_requested = True
+
+    def replace_detectors(self, detector_classes):
+        """Swaps in fresh instances of ``detector_classes``, keeping each detector's enabled flag."""
+        enabled = {detector.name: detector.enabled for detector in self.reaction_manager.detectors}
+        self.reaction_manager.clear()
+        for detector_class in detector_classes:
+            detector = self.reaction_manager.register(detector_class(self, self.reaction_manager))
+            detector.enabled = enabled.get(detector.name, True)
+
+
+    def perceive(self, frame):
+        """Runs hand and face inference once and bundles the results for the detectors."""
+        if self._requested_inference_rate is not None:
+            self._apply_inference_rate()
+        # Worker processes (the process backend) read the frame from shared memory, so convert straight into it
+        buffer = self.inference.input_buffer(frame.shape) if self.async_inference is None else None
+        if buffer is None:
+            if self._rgb is None or self._rgb.shape != frame.shape:
+                self._rgb = np.empty_like(frame)
+            buffer = self._rgb
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffer)
+
+        if self.async_inference is None:
+            result = self.inference.run(rgb)
+            return Perception(rgb, result.hands, result.faces, frame.shape, result.landmarks, result.handedness)
+
+        self.async_inference.submit(rgb)
+        result = self.async_inference.latest()
+        if result is None:
+            return Perception(rgb, None, [], frame.shape)
+
+        if result.seq != self._last_inference_seq:
+            self._last_inference_seq = result.seq
+            self.extrapolator.update(result.landmarks, result.timestamp, result.handedness)
+        landmarks = self.extrapolator.predict(time.monotonic())
+        return Perception(rgb, result.hands, result.faces, frame.shape, landmarks, self.extrapolator.handedness)
+
+    @property
+    def inference_rate(self):
+        return self.async_inference.rate_hz if self.async_inference is not None else None
+
+    def set_inference_rate(self, rate):
+        """Runs inference on its own thread at ``rate`` Hz, or inline with None, from the next frame on.
+
+        Safe to call from any thread; the switch itself happens on the frame thread.
+        """
+        self._requested_inference_rate = (rate,)
+
+    def _apply_inference_rate(self):
+        (rate,), self._requested_inference_rate = self._requested_inference_rate, None
+        if rate and self.async_inference is not None:
+            self.async_inference.rate_hz = rate
+            return
+        if self.async_inference is not None:
+            self.async_inference.stop()
+            self.async_inference = None
+        if rate:
+            self.extrapolator.reset()
+            self._last_inference_seq = 0
+            self.async_inference = AsyncInference(self.inference, rate)
+
+    def process_frame(self, frame, perception=None):
+        """Runs inference, the detectors and every effect on ``frame``, drawing in place.
+
+        A precomputed ``perception`` skips inference, e.g. for scripted or recorded landmarks.
+        """
+        if self._reload_requested:
+            self._reload_requested = False
+            self.hot_reloader.reload(self)
+        if perception is None:
+            with stage_timings.stage("inference"):
+                perception = self.perceive(frame)
+        if self.record_landmarks:
+            if self.recorder is None:
+                self.recorder = LandmarkRecorder(self.record_landmarks, frame.shape)
+            self.recorder.write(perception, time.monotonic())
+        if self.gesture_classifier is not None and perception.gesture_scores is None:
+            with stage_timings.stage("classify"):
+                perception.gesture_scores = self.gesture_classifier.scores(
+                    perception.landmarks, perception.handedness, perception.width / perception.height)
+        hands = perception.hands
 
         # Draw hand landmarks
         if hands and mp_drawing:
@@ -91,47 +156,40 @@ class Reactions:
 
         # # Draw face detections
         if mp_drawing:
-            if faces and mp_drawing:
-                for detection in faces:
-                    mp_drawing.draw_detection(frame, detection)
-
-
-        # Only run detectors if no reaction is currently active
-        if not self.reaction_manager.is_reaction_active():
-            self.thumbs_up_detector.detect(hands, frame)
-            self.peace_detector.detect(hands, frame)
-            if hands and len(hands) == 2:
-                self.heart_detector.detect(hands, frame)
-                self.blush_detector.detect(hands, frame)
-                self.fist_bump_detector.detect(hands, frame)
-            self.salute_detector.detect(hands, frame) # SaluteDetector now handles its own face detection
-
-
-        # Always apply effects, as they manage their own duration
-        # Pass the detected hand landmarks and face detections to apply_effect methods
-        self.thumbs_up_detector.apply_effect(frame, hands)
-        self.peace_detector.apply_effect(frame, hands)
-        self.heart_detector.apply_effect(frame, hands)
-        self.blush_detector.apply_effect(frame, hands)
-        self.fist_bump_detector.apply_effect(frame, hands)
-        self.salute_detector.apply_effect(frame, hands, faces) # Pass face detections to salute effect
-
-        self.update_and_draw_emojis(frame)
-
-    def spawn_fountain_emojis(self, frame, image_path):
+            for face in perception.faces:
+                x, y, w, h = face["bbox"]
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+
+        # Run the detectors that can match this frame, then every effect
+        self.reaction_manager.process(perception, frame)
+
+        with stage_timings.stage("emojis"):
+            self.update_and_draw_emojis(frame)
+
+    def spawn_fountain_emojis(self, frame, image_path, count=None):
+        count = self.emojis_per_frame if count is None else count
         h, w = frame.shape[:2]
         cx = w // 2
         cy = h - 100
-        vx = random.uniform(-2, 2)
-        vy = random.uniform(-10, -4) # Increased upward velocity
-        scale = random.uniform(0.4, 0.6)  # Scale factor for emoji size
-        self.active_emojis.append(Emoji(cx, cy, vx, vy, scale, image_path))
+        vx = np.random.uniform(-2, 2, count)
+        vy = np.random.uniform(-10, -4, count) # Increased upward velocity
+        scale = np.random.uniform(*FOUNTAIN_SCALE_RANGE, count)  # Scale factor for emoji size
+        self.particles.spawn(cx, cy, vx, vy, scale, image_path)
+
+    def preload_fountain_emojis(self, image_path):
+        sprite_cache.preload(image_path, *FOUNTAIN_SCALE_RANGE)
+
+    def preload(self, frame_shape):
+        """Decodes and prepares every detector's effect assets for frames of ``frame_shape``."""
+        for detector in list(self.reaction_manager.detectors):
+            detector.preload(frame_shape)
 
     def update_and_draw_emojis(self, frame):
-        updated = []
-        for emoji in self.active_emojis:
-            emoji.update()
-            emoji.draw(frame)
-            if -50 < emoji.y < frame.shape[0] + 50:
-                updated.append(emoji)
-        self.active_emojis = updated
+        self.particles.step(frame)
+
+    def close(self):
+        if self.async_inference is not None:
+            self.async_inference.stop()
+        self.inference.close()
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from compositing import Sprite
+
+
+class SpriteCache:
+    """Process-wide cache of decoded, pre-resized premultiplied sprites.
+
+    Entries are keyed by asset path and quantized scale and evicted least
+    recently used first once their total size exceeds ``max_bytes``. The
+    decoded full-size assets the sprites are resized from count towards
+    ``max_bytes`` too and are only evicted when evicting sprites alone
+    can't get back under it.
+    Returned sprites are shared and read-only.
+    """
+
+    def __init__(self, base_size=50, scale_step=0.05, max_bytes=32 * 1024 * 1024):
+        self.base_size = base_size # Sprite edge length in pixels at scale 1.0
+        self.scale_step = scale_step
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.source_bytes = 0 # Part of nbytes held by _sources
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sources = OrderedDict() # Decoded full-size assets, so new scale buckets don't hit the disk
+        self._lock = threading.Lock()
+
+    def quantize(self, scale):
+        """Returns the scale bucket used as part of the cache key."""
+        return max(1, int(round(scale / self.scale_step)))
+
+    def get(self, image_path, scale):
+        """Returns the shared sprite for ``image_path`` at ``scale``, or None if the asset can't be read."""
+        key = (image_path, self.quantize(scale))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        sprite = self._build(image_path, key[1] * self.scale_step)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = sprite
+                self.nbytes += sprite.nbytes if sprite is not None else 0
+                self._evict()
+            return self._entries[key]
+
+    def preload(self, image_path, min_scale, max_scale):
+        """Builds every scale bucket between ``min_scale`` and ``max_scale`` ahead of the first frame that needs it."""
+        for bucket in range(self.quantize(min_scale), self.quantize(max_scale) + 1):
+            self.get(image_path, bucket * self.scale_step)
+
+    def _build(self, image_path, scale):
+        with self._lock:
+            source = self._sources.get(image_path)
+            if source is not None:
+                self._sources.move_to_end(image_path)
+        if source is None:
+            source = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+            if source is None:
+                print(f"SpriteCache: Error loading image: {image_path}")
+                return None
+            if source.ndim == 2 or source.shape[2] == 3:
+                source = cv2.cvtColor(source, cv2.COLOR_GRAY2BGRA if source.ndim == 2 else cv2.COLOR_BGR2BGRA)
+            with self._lock:
+                # A source too big for the cap on its own would only push every sprite out; decode it per bucket
+                if image_path not in self._sources and source.nbytes <= self.max_bytes:
+                    self._sources[image_path] = source
+                    self.nbytes += source.nbytes
+                    self.source_bytes += source.nbytes
+
+        size = max(1, int(self.base_size * scale))
+        return Sprite.from_bgra(cv2.resize(source, (size, size), interpolation=cv2.INTER_AREA))
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            sprites_can_fit = self.nbytes - self.source_bytes > self.nbytes - self.max_bytes
+            if len(self._entries) > 1 and (sprites_can_fit or not self._sources):
+                _, sprite = self._entries.popitem(last=False)
+                self.nbytes -= sprite.nbytes if sprite is not None else 0
+            elif self._sources:
+                _, source = self._sources.popitem(last=False) # Decoded again from disk on the next new bucket
+                self.nbytes -= source.nbytes
+                self.source_bytes -= source.nbytes
+            else:
+                break
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sources.clear()
+            self.nbytes = 0
+            self.source_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "sources": len(self._sources),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+sprite_cache = SpriteCache()
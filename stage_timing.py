@@ -0,0 +1,117 @@
+import threading
+import time
+
+import numpy as np
+
+
+class _Stage:
+    """Context manager timing one stage into its ring buffer. Each stage runs on a single thread."""
+
+    __slots__ = ("samples", "count", "_start")
+
+    def __init__(self, window):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.add(time.perf_counter() - self._start)
+
+    def add(self, seconds):
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+
+    def window(self):
+        return self.samples[:min(self.count, len(self.samples))]
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageTimings:
+    """Rolling latency percentiles for every stage of the frame loop.
+
+    Code wraps a stage in ``with stage_timings.stage("name"):``. Each stage
+    keeps its last ``window`` durations in a ring buffer; percentiles are
+    only computed when a summary is asked for. Disabled, stage() hands out a
+    shared do-nothing context manager, so the instrumentation costs one
+    attribute check per stage.
+    """
+
+    def __init__(self, enabled=False, window=300, report_interval=10.0):
+        self.enabled = enabled
+        self.window = window
+        self.report_interval = report_interval # Seconds between maybe_report() summary lines
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._last_report = time.monotonic()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        stage = self._stages.get(name)
+        if stage is None:
+            with self._lock:
+                stage = self._stages.setdefault(name, _Stage(self.window))
+        return stage
+
+    def record(self, name, seconds):
+        """Adds a duration measured elsewhere."""
+        if self.enabled:
+            self.stage(name).add(seconds)
+
+    def summary(self):
+        """{stage: {"count", "p50_ms", "p95_ms", "p99_ms", "max_ms"}} over each stage's window."""
+        with self._lock:
+            stages = list(self._stages.items())
+        summary = {}
+        for name, stage in stages:
+            samples = stage.window() * 1000
+            if not len(samples):
+                continue
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            summary[name] = {
+                "count": stage.count,
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(samples.max()), 3),
+            }
+        return summary
+
+    def summary_line(self):
+        return " | ".join(
+            f"{name} {s['p50_ms']:.2f}/{s['p95_ms']:.2f}/{s['p99_ms']:.2f}/{s['max_ms']:.2f}"
+            for name, s in self.summary().items()
+        )
+
+    def maybe_report(self):
+        """Prints a p50/p95/p99/max summary line (ms) once every ``report_interval`` seconds."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self._last_report < self.report_interval:
+            return
+        self._last_report = now
+        print(f"Stage timings p50/p95/p99/max ms: {self.summary_line()}")
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+
+stage_timings = StageTimings()
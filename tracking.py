@@ -0,0 +1,179 @@
+import cv2
+import numpy as np
+
+from Detections.hand_features import WRIST
+
+
+class LandmarkExtrapolator:
+    """Predicts hand landmarks between inference results with a per-landmark velocity filter.
+
+    Every update() measures the velocity of each landmark since the previous
+    result and blends it into a running estimate; predict() moves the last
+    measured landmarks along that velocity, for at most ``max_horizon``
+    seconds so a stalled inference thread can't fling the hands off screen.
+    ``handedness`` holds the labels of the last result in the same hand
+    order as the predicted landmarks.
+    """
+
+    def __init__(self, smoothing=0.6, max_horizon=0.25):
+        self.smoothing = smoothing # Weight of the newest velocity measurement
+        self.max_horizon = max_horizon
+        self.reset()
+
+    def reset(self):
+        self.landmarks = np.zeros((0, 21, 3), dtype=np.float32)
+        self.velocity = np.zeros_like(self.landmarks)
+        self.handedness = []
+        self.timestamp = None
+
+    def update(self, landmarks, timestamp, handedness=()):
+        if self.timestamp is None or len(landmarks) != len(self.landmarks) or len(landmarks) == 0:
+            # New or changed set of hands, nothing to measure velocity against
+            self.landmarks = landmarks
+            self.velocity = np.zeros_like(landmarks)
+            self.handedness = list(handedness)
+            self.timestamp = timestamp
+            return
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return
+        order = self._match(landmarks)
+        landmarks = landmarks[order]
+        # The labels follow their hands, or they would swap sides whenever MediaPipe swaps the hands
+        self.handedness = [handedness[i] for i in order] if len(handedness) == len(order) else list(handedness)
+        measured = (landmarks - self.landmarks) / dt
+        self.velocity = self.smoothing * measured + (1 - self.smoothing) * self.velocity
+        self.landmarks = landmarks
+        self.timestamp = timestamp
+
+    def _match(self, landmarks):
+        """The order of the new hands that lines them up with the previous ones (MediaPipe may swap them)."""
+        order = np.arange(len(landmarks))
+        if len(landmarks) != 2:
+            return order
+        prev = self.landmarks[:, WRIST, :2]
+        new = landmarks[:, WRIST, :2]
+        straight = np.abs(prev - new).sum()
+        swapped = np.abs(prev - new[::-1]).sum()
+        return order[::-1] if swapped < straight else order
+
+    def predict(self, timestamp):
+        if self.timestamp is None or len(self.landmarks) == 0:
+            return self.landmarks
+        dt = min(max(timestamp - self.timestamp, 0.0), self.max_horizon)
+        return (self.landmarks + self.velocity * dt).astype(np.float32)
+
+
+def hand_roi(landmarks, faces, frame_shape, padding=0.4, min_size=128):
+    """Pixel box (x0, y0, x1, y1) around the given hands and faces, padded by ``padding`` of its size.
+
+    Returns None when there are no hands to track.
+    """
+    if len(landmarks) == 0:
+        return None
+    h, w = frame_shape[:2]
+    xy = landmarks[..., :2].reshape(-1, 2) * (w, h)
+    x0, y0 = xy.min(axis=0)
+    x1, y1 = xy.max(axis=0)
+    for face in faces or ():
+        fx, fy, fw, fh = face["bbox"]
+        x0, y0 = min(x0, fx), min(y0, fy)
+        x1, y1 = max(x1, fx + fw), max(y1, fy + fh)
+
+    # Pad, and keep the crop from collapsing onto a single small hand
+    pad_x = max((x1 - x0) * padding, (min_size - (x1 - x0)) / 2)
+    pad_y = max((y1 - y0) * padding, (min_size - (y1 - y0)) / 2)
+    x0, x1 = max(int(x0 - pad_x), 0), min(int(x1 + pad_x), w)
+    y0, y1 = max(int(y0 - pad_y), 0), min(int(y1 + pad_y), h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
+
+
+def map_hands_from_roi(hands, box, frame_shape):
+    """Rewrites MediaPipe hand landmarks detected in a crop to full-frame normalized coordinates, in place."""
+    h, w = frame_shape[:2]
+    x0, y0, x1, y1 = box
+    sx, sy = (x1 - x0) / w, (y1 - y0) / h
+    ox, oy = x0 / w, y0 / h
+    for hand in hands:
+        for lm in hand.landmark:
+            lm.x = lm.x * sx + ox
+            lm.y = lm.y * sy + oy
+            lm.z = lm.z * sx # z shares the x scale
+    return hands
+
+
+class FaceTracker:
+    """Carries face boxes and keypoints forward between face detections by template matching.
+
+    After each detection the face patches are kept as grayscale templates.
+    On the following frames each template is searched for in a window
+    around its last box and the box and keypoints are shifted by the best
+    match. track() gives up (returns None) once ``detect_interval`` frames
+    have passed or a match scores below ``min_confidence``, which tells the
+    caller to run the detector again.
+    """
+
+    def __init__(self, detect_interval=5, min_confidence=0.6, search_margin=0.25):
+        self.detect_interval = detect_interval
+        self.min_confidence = min_confidence
+        self.search_margin = search_margin # Search window padding, as a fraction of the face size
+        self.detections = 0
+        self.tracked = 0
+        self.confidence = 0.0
+        self.faces = []
+        self._templates = []
+        self._frames_since_detect = detect_interval
+
+    def reset(self, rgb, faces):
+        """Starts tracking freshly detected ``faces`` (bbox/keypoint dicts in pixels)."""
+        self.detections += 1
+        self._frames_since_detect = 0
+        self.faces = faces
+        self._templates = []
+        h, w = rgb.shape[:2]
+        for face in faces:
+            x, y, fw, fh = face["bbox"]
+            x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + fw, w), min(y + fh, h)
+            if x1 - x0 < 8 or y1 - y0 < 8:
+                self._templates.append(None)
+                continue
+            self._templates.append(((x0 - x, y0 - y), cv2.cvtColor(rgb[y0:y1, x0:x1], cv2.COLOR_RGB2GRAY)))
+
+    def track(self, rgb):
+        """Returns the faces moved to their position in ``rgb``, or None if a detection is due."""
+        if self._frames_since_detect >= self.detect_interval - 1:
+            return None
+        h, w = rgb.shape[:2]
+        tracked = []
+        confidence = 1.0
+        for face, entry in zip(self.faces, self._templates):
+            if entry is None:
+                return None
+            (off_x, off_y), template = entry
+            th, tw = template.shape
+            x, y = face["bbox"][0] + off_x, face["bbox"][1] + off_y # Template's top-left in the last frame
+            mx, my = int(tw * self.search_margin) + 1, int(th * self.search_margin) + 1
+            x0, y0 = max(x - mx, 0), max(y - my, 0)
+            x1, y1 = min(x + tw + mx, w), min(y + th + my, h)
+            if x1 - x0 < tw or y1 - y0 < th:
+                return None
+            window = cv2.cvtColor(rgb[y0:y1, x0:x1], cv2.COLOR_RGB2GRAY)
+            _, score, _, (best_x, best_y) = cv2.minMaxLoc(cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED))
+            if score < self.min_confidence:
+                return None
+            confidence = min(confidence, score)
+            dx, dy = x0 + best_x - x, y0 + best_y - y
+            bx, by, bw, bh = face["bbox"]
+            tracked.append({
+                "bbox": (bx + dx, by + dy, bw, bh),
+                "keypoints": [(kx + dx, ky + dy) for kx, ky in face["keypoints"]],
+            })
+
+        self.faces = tracked
+        self.confidence = confidence
+        self._frames_since_detect += 1
+        self.tracked += 1
+        return tracked
@@ -0,0 +1,57 @@
+import cv2
+import numpy as np
+
+
+class Transition:
+    """Full-frame transition drawn in place from a progress value in [0, 1].
+
+    Subclasses reuse their buffers across frames, so running a transition
+    doesn't allocate per frame once the first frame has been seen.
+    """
+
+    def __init__(self):
+        self._source = None
+
+    def source_copy(self, frame):
+        """Copies ``frame`` into a reused buffer, for transitions that read and write the same frame."""
+        if self._source is None or self._source.shape != frame.shape:
+            self._source = np.empty_like(frame)
+        np.copyto(self._source, frame)
+        return self._source
+
+    def apply(self, frame, progress):
+        """Draws the transition at ``progress`` onto ``frame`` in place; the base transition leaves the frame as it is."""
+        pass
+
+
+class SqueezeTransition(Transition):
+    """Squeezes the frame towards its center along one axis, filling the freed bands with ``fill``.
+
+    ``axis=1`` squeezes sideways, ``axis=0`` vertically. At progress 0 the
+    frame is untouched, at 1 it is squeezed to a single pixel line.
+    """
+
+    def __init__(self, axis=1, fill=0):
+        super().__init__()
+        self.axis = axis
+        self.fill = fill
+
+    def apply(self, frame, progress):
+        if progress <= 0:
+            return
+        h, w = frame.shape[:2]
+        length = w if self.axis == 1 else h
+        # Prevent the squeezed size from becoming zero or negative
+        squeezed = max(1, int(length * (1 - progress)))
+        start = (length - squeezed) // 2
+        end = start + squeezed
+
+        source = self.source_copy(frame)
+        if self.axis == 1:
+            cv2.resize(source, (squeezed, h), dst=frame[:, start:end])
+            frame[:, :start] = self.fill
+            frame[:, end:] = self.fill
+        else:
+            cv2.resize(source, (w, squeezed), dst=frame[start:end])
+            frame[:start] = self.fill
+            frame[end:] = self.fill
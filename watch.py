@@ -1,78 +1,33 @@
 import time
+import signal
 import subprocess
 import sys
 import os
+import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
-class ChangeHandler(FileSystemEventHandler):
-    def __init__(self):
-        self.process = None
-        self.check_modprobe()
-        self.start_script()
-
-    def check_modprobe(self):
-        try:
-            # Check if module is already loaded
-            lsmod = subprocess.check_output(['lsmod']).decode()
-            if 'v4l2loopback' not in lsmod:
-                print("Loading v4l2loopback kernel module...")
-                subprocess.run([
-                    'sudo', 'modprobe', 'v4l2loopback',
-                    'devices=1',
-                    'video_nr=10',
-                    'card_label=Reactions',
-                    'exclusive_caps=1'
-                ], check=True)
-            else:
-                print("v4l2loopback already loaded.")
-        except subprocess.CalledProcessError as e:
-            print("Failed to load v4l2loopback module. Check permissions or kernel setup.")
-            sys.exit(1)
+from hot_reload import is_hot_reloadable
 
-    def start_script(self):
-        print("Starting main.py...")
-        python_exec = sys.executable  # use same python running this
-        self.process = subprocess.Popen([python_exec, 'main.py'])
+# Saves often arrive as a burst of events (write, chmod, atomic rename); act once they settle
+DEBOUNCE_SECONDS = 0.5
 
-    def stop_script(self):
-        if self.process and self.process.poll() is None:
-            print("Stopping main.py...")
-            self.process.terminate()
-            try:
-                self.process.wait(timeout=3)
-            except subprocess.TimeoutExpired:
-                self.process.kill()
-
-    def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith(('.py',)):
-            print(f"Detected change in {event.src_path}. Restarting...")
-            self.stop_script()
-            self.start_script()
+class ChangeHandler(FileSystemEventHandler):
+    """Restarts main.py on code changes, or with hot reload, reloads detector and effect code in place.
 
-if __name__ == "__main__":
-    watch_path = "."
-    event_handler = ChangeHandler()
-    observer = Observer()
-    observer.schedule(event_handler, watch_path, recursive=False)
-    observer.start()
+    Hot reload sends main.py SIGUSR1, which reloads the changed Detections
+    and effect modules inside the running process (see hot_reload.py), so
+    the camera, the virtual camera and the MediaPipe graphs stay up. Any
+    other change (main.py, reactions.py, the pipeline, inference) still
+    restarts the whole script.
+    """
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
-import time
-import subprocess
-import sys
-import os
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-
-class ChangeHandler(FileSystemEventHandler):
-    def __init__(self):
+    def __init__(self, hot_reload=True):
         self.process = None
+        self.hot_reload = hot_reload and hasattr(signal, 'SIGUSR1')
+        self._pending = set()
+        self._last_event = 0.0
+        self._lock = threading.Lock()
         self.check_modprobe()
         self.start_script()
 
@@ -83,7 +38,7 @@ class ChangeHandler(FileSystemEventHandler):
             if 'v4l2loopback' not in lsmod:
                 print("Loading v4l2loopback kernel module...")
                 subprocess.run([
-                    'modprobe', 'v4l2loopback',
+                    'sudo', 'modprobe', 'v4l2loopback',
                     'devices=1',
                     'video_nr=10',
                     'card_label=Reactions',
@@ -109,22 +64,46 @@ class ChangeHandler(FileSystemEventHandler):
             except subprocess.TimeoutExpired:
                 self.process.kill()
 
-    def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith(('.py',)):
-            print(f"Detected change in {event.src_path}. Restarting...")
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ('modified', 'created', 'moved'):
+            return
+        # Editors that save atomically write a temp file and rename it over the original
+        path = getattr(event, 'dest_path', '') or event.src_path
+        if not path.endswith('.py') or '__pycache__' in path:
+            return
+        with self._lock:
+            self._pending.add(os.path.abspath(path))
+            self._last_event = time.monotonic()
+
+    def flush(self):
+        """Acts on the changes seen so far once no new event has arrived for DEBOUNCE_SECONDS."""
+        with self._lock:
+            if not self._pending or time.monotonic() - self._last_event < DEBOUNCE_SECONDS:
+                return
+            paths, self._pending = sorted(self._pending), set()
+
+        names = ', '.join(os.path.relpath(path) for path in paths)
+        running = self.process is not None and self.process.poll() is None
+        if self.hot_reload and running and all(is_hot_reloadable(path) for path in paths):
+            print(f"Detected change in {names}. Hot reloading...")
+            self.process.send_signal(signal.SIGUSR1)
+        else:
+            print(f"Detected change in {names}. Restarting...")
             self.stop_script()
             self.start_script()
 
 if __name__ == "__main__":
     watch_path = "."
-    event_handler = ChangeHandler()
+    event_handler = ChangeHandler(hot_reload='--restart-only' not in sys.argv)
     observer = Observer()
-    observer.schedule(event_handler, watch_path, recursive=False)
+    observer.schedule(event_handler, watch_path, recursive=True)
     observer.start()
 
     try:
         while True:
-            time.sleep(1)
+            time.sleep(0.1)
+            event_handler.flush()
     except KeyboardInterrupt:
         observer.stop()
+        event_handler.stop_script()
     observer.join()